@@ -1,5 +1,5 @@
 import os
-from flask import Flask, render_template, request, jsonify, redirect, url_for, flash
+from flask import Flask, render_template, request, jsonify, redirect, url_for, flash, Response, stream_with_context, send_file, abort, g
 import librouteros
 from librouteros.query import Key
 from librouteros import login
@@ -9,13 +9,23 @@ import json
 from dotenv import load_dotenv
 import socket
 import ssl
+import hashlib
+import hmac
+import voucher_sheet
+import voucher_io
+import voucher_ledger
+import config_store
+import profiling
+import random
+import string
+from email.utils import formatdate
+from circuit_breaker import CircuitBreaker
+from hotspot_rows import HotspotUser, API_USER_FIELDS
+from voucher_cache import VoucherCache
+from logging_setup import setup_logging, register_secret, new_request_id, clear_request_id, request_duration_ms
 
 # Set up logging
-logging.basicConfig(
-    filename='app.log',
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
+setup_logging('app.log')
 logger = logging.getLogger(__name__)
 
 # Load environment variables jika ada
@@ -34,25 +44,46 @@ config = {
     'PASSWORD_MIKROTIK': os.environ.get('PASSWORD_MIKROTIK', ''),
     'TELEGRAM_TOKEN': os.environ.get('TELEGRAM_TOKEN', ''),
     'TELEGRAM_CHAT_ID': os.environ.get('TELEGRAM_CHAT_ID', ''),
+    'NOTIFY_HOTSPOT_EVENTS': os.environ.get('NOTIFY_HOTSPOT_EVENTS', 'True') == 'True',
+    'HOTSPOT_LOGIN_URL': os.environ.get('HOTSPOT_LOGIN_URL', ''),
+    'API_TOKEN': os.environ.get('API_TOKEN', ''),
 }
 
-# Simpan config ke file
+# Pesan error jika config.json ada tetapi tidak dapat dibaca (kunci salah/tidak ada);
+# selama terisi, penyimpanan ditolak agar file tidak tertimpa nilai default
+config_error = None
+
+# Simpan config ke file, mengembalikan pesan error atau None
 def save_config():
+    if config_error:
+        logger.error("Konfigurasi tidak disimpan karena config.json tidak dapat dibaca: %s", config_error)
+        return f"config.json tidak dapat dibaca ({config_error})"
+    
+    register_secret(config.get('PASSWORD_MIKROTIK'))
+    register_secret(config.get('TELEGRAM_TOKEN'))
+    register_secret(config.get('API_TOKEN'))
     try:
-        with open('config.json', 'w') as f:
-            json.dump(config, f)
+        config_store.save(config)
         logger.info("Konfigurasi berhasil disimpan ke config.json")
+        return None
     except Exception as e:
-        logger.error(f"Gagal menyimpan konfigurasi: {e}")
+        logger.error("Gagal menyimpan konfigurasi: %s", e)
+        return str(e)
 
 # Load config dari file
 def load_config():
-    global config
+    global config, config_error
     try:
-        with open('config.json', 'r') as f:
-            loaded_config = json.load(f)
-            config.update(loaded_config)
+        config.update(config_store.load())
+        config_error = None
+        register_secret(config.get('PASSWORD_MIKROTIK'))
+        register_secret(config.get('TELEGRAM_TOKEN'))
+        register_secret(config.get('API_TOKEN'))
         logger.info("Konfigurasi berhasil dimuat dari config.json")
+    except config_store.ConfigError as e:
+        # Jangan timpa config terenkripsi dengan nilai default jika kunci salah/tidak ada
+        config_error = str(e)
+        logger.error("Config tidak dapat didekripsi, menggunakan nilai default tanpa menyimpan: %s", e)
     except (FileNotFoundError, json.JSONDecodeError):
         # Jika file tidak ada atau tidak valid, simpan config default
         logger.warning("File konfigurasi tidak ditemukan atau tidak valid, menggunakan nilai default")
@@ -61,12 +92,71 @@ def load_config():
 # Load config pada saat startup
 load_config()
 
+@app.before_request
+def begin_request():
+    g.request_id = new_request_id()
+
+# Endpoint yang membaca atau menulis data user hotspot (termasuk password) lewat HTTP
+TOKEN_PROTECTED_PATHS = ('/api', '/export', '/import', '/vouchers')
+
+def token_required(path):
+    return any(path == prefix or path.startswith(prefix + '/') for prefix in TOKEN_PROTECTED_PATHS)
+
+@app.before_request
+def require_api_token():
+    """Endpoint API, export/import, dan lembar cetak membutuhkan API Token dari config.
+    
+    Token dikirim sebagai Bearer atau header X-API-Token; parameter ?token= juga
+    diterima agar lembar cetak dan export bisa dibuka langsung dari browser.
+    """
+    if not token_required(request.path):
+        return None
+    
+    token = config.get('API_TOKEN')
+    if not token:
+        return api_error('API dinonaktifkan. Atur API Token di web interface terlebih dahulu.', 403)
+    
+    authorization = request.headers.get('Authorization', '')
+    if authorization.startswith('Bearer '):
+        supplied = authorization[len('Bearer '):].strip()
+    else:
+        supplied = request.headers.get('X-API-Token') or request.args.get('token', '')
+    if not hmac.compare_digest(supplied.encode('utf-8'), token.encode('utf-8')):
+        logger.warning("Request API ditolak: token tidak valid (%s %s)", request.method, request.path)
+        response, status = api_error('API Token tidak valid', 401)
+        response.headers['WWW-Authenticate'] = 'Bearer'
+        return response, status
+    return None
+
+@app.after_request
+def end_request(response):
+    logger.info("%s %s %s", request.method, request.path, response.status_code,
+                extra={'duration_ms': request_duration_ms()})
+    response.headers['X-Request-ID'] = g.request_id
+    clear_request_id()
+    return response
+
 @app.route('/')
 def index():
-    return render_template('index.html', config=config)
+    return render_template('index.html', config=config, slow_commands=profiling.slowest_traces())
+
+@app.route('/profiling/<name>')
+def profiling_trace(name):
+    """Isi lengkap satu trace command lambat (span tree dan statistik cProfile)"""
+    path = os.path.join(profiling.TRACES_DIR, os.path.basename(name))
+    if not path.endswith('.json') or not os.path.isfile(path):
+        abort(404)
+    with open(path, 'r') as f:
+        return jsonify(json.load(f))
 
 @app.route('/save_config', methods=['POST'])
 def save_config_route():
+    # Baca ulang file agar nilai yang diubah di luar web (config_store.py set) tidak tertimpa
+    load_config()
+    if config_error:
+        flash(f'Konfigurasi tidak disimpan: config.json tidak dapat dibaca ({config_error})', 'danger')
+        return redirect(url_for('index'))
+    
     config['IP_MIKROTIK'] = request.form.get('IP_MIKROTIK')
     config['PORT_API_MIKROTIK'] = request.form.get('PORT_API_MIKROTIK')
     config['USE_SSL'] = request.form.get('USE_SSL') == 'on'
@@ -75,9 +165,15 @@ def save_config_route():
     config['PASSWORD_MIKROTIK'] = request.form.get('PASSWORD_MIKROTIK')
     config['TELEGRAM_TOKEN'] = request.form.get('TELEGRAM_TOKEN')
     config['TELEGRAM_CHAT_ID'] = request.form.get('TELEGRAM_CHAT_ID')
+    config['NOTIFY_HOTSPOT_EVENTS'] = request.form.get('NOTIFY_HOTSPOT_EVENTS') == 'on'
+    config['HOTSPOT_LOGIN_URL'] = request.form.get('HOTSPOT_LOGIN_URL', '').strip()
+    config['API_TOKEN'] = request.form.get('API_TOKEN', '').strip()
     
-    save_config()
-    flash('Konfigurasi telah disimpan!', 'success')
+    error = save_config()
+    if error:
+        flash(f'Gagal menyimpan konfigurasi: {error}', 'danger')
+    else:
+        flash('Konfigurasi telah disimpan!', 'success')
     return redirect(url_for('index'))
 
 @app.route('/test_mikrotik', methods=['POST'])
@@ -92,35 +188,37 @@ def test_mikrotik():
         sock.close()
         
         # Coba koneksi Mikrotik API
-        mikrotik_api = connect_to_mikrotik()
+        mikrotik_api = connect_to_mikrotik(bypass_breaker=True)
         if mikrotik_api:
             # Coba akses resources untuk memastikan koneksi berfungsi
             resources = mikrotik_api.path('/system/resource')
             resource_list = list(resources)
             mikrotik_api.close()
-            logger.info(f"Koneksi ke Mikrotik berhasil. Resource info: {resource_list}")
+            logger.info("Koneksi ke Mikrotik berhasil (RouterOS %s)", resource_list[0].get('version') if resource_list else 'unknown')
+            logger.debug("Resource info: %s", resource_list)
             return jsonify({'success': True, 'message': 'Berhasil terhubung ke Mikrotik!'})
     except socket.gaierror:
         return jsonify({'success': False, 'message': f'Gagal terhubung ke Mikrotik: Nama host tidak dapat diselesaikan'})
     except socket.timeout:
         return jsonify({'success': False, 'message': f'Gagal terhubung ke Mikrotik: Koneksi timeout'})
-    except librouteros.exceptions.AuthenticationError:
+    except librouteros.exceptions.TrapError:
+        # Login ditolak router (librouteros 3 melempar TrapError, bukan AuthenticationError)
         logger.error("Mikrotik authentication error: username/password salah")
         return jsonify({'success': False, 'message': 'Gagal terhubung ke Mikrotik: Username atau password salah'})
     except librouteros.exceptions.ConnectionClosed as e:
-        logger.error(f"Mikrotik connection closed: {e}")
+        logger.error("Mikrotik connection closed: %s", e)
         return jsonify({'success': False, 'message': f'Gagal terhubung ke Mikrotik: Error koneksi. Pastikan API service aktif dan port benar.'})
     except librouteros.exceptions.FatalError as e:
-        logger.error(f"Mikrotik fatal error: {e}")
+        logger.error("Mikrotik fatal error: %s", e)
         return jsonify({'success': False, 'message': f'Gagal terhubung ke Mikrotik: Error fatal - {str(e)}'})
     except ValueError as e:
-        logger.error(f"Value error: {e}")
+        logger.error("Value error: %s", e)
         return jsonify({'success': False, 'message': f'Gagal terhubung ke Mikrotik: Error konfigurasi SSL - {str(e)}'})
     except TypeError as e:
-        logger.error(f"Type error: {e}")
+        logger.error("Type error: %s", e)
         return jsonify({'success': False, 'message': f'Gagal terhubung ke Mikrotik: Error SSL - {str(e)}'})
     except Exception as e:
-        logger.error(f"Mikrotik connection error: {e}")
+        logger.error("Mikrotik connection error: %s", e)
         return jsonify({'success': False, 'message': f'Gagal terhubung ke Mikrotik: {str(e)}'})
 
 @app.route('/test_telegram', methods=['POST'])
@@ -133,7 +231,7 @@ def test_telegram():
 
         bot = telegram.Bot(token=token)
         bot_info = bot.get_me()
-        logger.info(f"Bot info: {bot_info.username}")
+        logger.info("Bot info: %s", bot_info.username)
         
         chat_id = config['TELEGRAM_CHAT_ID']
         bot.send_message(chat_id=chat_id, 
@@ -147,17 +245,399 @@ def test_telegram():
         return jsonify({'success': False, 'message': 'Gagal terhubung ke Telegram: Token tidak sah atau sudah dicabut'})
     except telegram.error.BadRequest as e:
         if 'chat not found' in str(e).lower():
-            logger.error(f"Telegram chat ID not found: {e}")
+            logger.error("Telegram chat ID not found: %s", e)
             return jsonify({'success': False, 'message': 'Gagal terhubung ke Telegram: Chat ID tidak ditemukan'})
         else:
-            logger.error(f"Telegram bad request: {e}")
+            logger.error("Telegram bad request: %s", e)
             return jsonify({'success': False, 'message': f'Gagal terhubung ke Telegram: {str(e)}'})
     except Exception as e:
-        logger.error(f"Telegram connection error: {e}")
+        logger.error("Telegram connection error: %s", e)
         return jsonify({'success': False, 'message': f'Gagal terhubung ke Telegram: {str(e)}'})
 
-def connect_to_mikrotik():
-    """Fungsi untuk terhubung ke API Mikrotik"""
+# Kolom yang dibutuhkan lembar cetak voucher
+PRINT_FIELDS = ('name', 'password', 'profile', 'limit-uptime', 'comment')
+
+def iter_hotspot_users(api, comment=None, profile=None):
+    """Generator user hotspot untuk dicetak, difilter berdasarkan komentar/profile.
+    
+    Koneksi dibuat oleh route sebelum Response dibangun agar kegagalan koneksi
+    bisa dijawab dengan 502; generator ini menutupnya setelah iterasi selesai.
+    """
+    # Filter dijalankan di router dan baris dibaca satu per satu; Query librouteros
+    # menampung seluruh balasan sebelum mengembalikan baris pertama
+    query = []
+    if comment:
+        query.append(f"?comment={comment}")
+    if profile:
+        query.append(f"?profile={profile}")
+    try:
+        yield from voucher_io.iter_rows(api, 'ip/hotspot/user', PRINT_FIELDS, *query)
+    finally:
+        api.close()
+
+@app.route('/vouchers/print')
+def print_vouchers():
+    """Lembar cetak voucher HTML dengan QR code login, dirender secara streaming"""
+    comment = request.args.get('comment')
+    profile = request.args.get('profile')
+    if not comment and not profile:
+        abort(400, 'Parameter comment atau profile wajib diisi')
+    
+    try:
+        api = connect_to_mikrotik()
+    except Exception as e:
+        return jsonify({'success': False, 'message': f'Gagal terhubung ke Mikrotik: {str(e)}'}), 502
+    
+    title = f"Voucher {comment or profile}"
+    users = iter_hotspot_users(api, comment, profile)
+    return Response(
+        stream_with_context(voucher_sheet.render_html(users, config.get('HOTSPOT_LOGIN_URL'), title)),
+        mimetype='text/html'
+    )
+
+@app.route('/vouchers/print.png')
+def print_vouchers_png():
+    """Satu halaman kartu voucher dalam format PNG"""
+    comment = request.args.get('comment')
+    profile = request.args.get('profile')
+    page_number = request.args.get('page', 1, type=int)
+    if not comment and not profile:
+        abort(400, 'Parameter comment atau profile wajib diisi')
+    if not voucher_sheet.png_available():
+        abort(501, 'Render PNG membutuhkan paket qrcode dan Pillow')
+    
+    try:
+        api = connect_to_mikrotik()
+    except Exception as e:
+        return jsonify({'success': False, 'message': f'Gagal terhubung ke Mikrotik: {str(e)}'}), 502
+    
+    users = iter_hotspot_users(api, comment, profile)
+    try:
+        for number, page in enumerate(voucher_sheet.iter_pages(users), start=1):
+            if number == page_number:
+                image = voucher_sheet.render_png_page(page, config.get('HOTSPOT_LOGIN_URL'))
+                return send_file(image, mimetype='image/png', download_name=f'voucher-{page_number}.png')
+    except Exception as e:
+        logger.error("Gagal membaca user hotspot untuk PNG: %s", e)
+        return jsonify({'success': False, 'message': f'Gagal membaca user hotspot: {str(e)}'}), 502
+    finally:
+        # Menutup generator juga menutup koneksi Mikrotik jika halaman ditemukan lebih awal
+        users.close()
+    abort(404, 'Halaman tidak ditemukan')
+
+@app.route('/export/users.<fmt>')
+def export_users(fmt):
+    """Export seluruh user hotspot sebagai CSV atau NDJSON secara streaming"""
+    if fmt not in voucher_io.FORMATS:
+        abort(404)
+    
+    query = []
+    if request.args.get('profile'):
+        query.append(f"?profile={request.args['profile']}")
+    if request.args.get('comment'):
+        query.append(f"?comment={request.args['comment']}")
+    
+    try:
+        api = connect_to_mikrotik()
+    except Exception as e:
+        return jsonify({'success': False, 'message': f'Gagal terhubung ke Mikrotik: {str(e)}'}), 502
+    
+    def generate():
+        try:
+            rows = voucher_io.iter_rows(api, 'ip/hotspot/user', voucher_io.EXPORT_FIELDS, *query)
+            yield from voucher_io.export_chunks(rows, fmt)
+        finally:
+            api.close()
+    
+    logger.info("Export user hotspot format %s", fmt)
+    return Response(
+        stream_with_context(generate()),
+        mimetype=voucher_io.FORMATS[fmt],
+        headers={'Content-Disposition': f'attachment; filename=hotspot-users.{fmt}'}
+    )
+
+@app.route('/import', methods=['POST'])
+def import_users():
+    """Import user hotspot dari file CSV/NDJSON, diproses per batch di background"""
+    upload = request.files.get('file')
+    if not upload or not upload.filename:
+        return jsonify({'success': False, 'message': 'File import wajib diupload'}), 400
+    
+    fmt = upload.filename.rsplit('.', 1)[-1].lower()
+    if fmt not in voucher_io.FORMATS:
+        return jsonify({'success': False, 'message': 'Format file harus .csv atau .ndjson'}), 400
+    
+    job = voucher_io.ImportJob.from_upload(upload.stream, fmt)
+    started = job.start(connect_to_mikrotik)
+    logger.info("Import %s dimulai (baru dijalankan: %s)", job.job_id, started)
+    return jsonify({
+        'success': True,
+        'job_id': job.job_id,
+        'status_url': url_for('import_status', job_id=job.job_id),
+        'resumed': job.state['processed'] > 0,
+    }), 202
+
+@app.route('/import/<job_id>')
+def import_status(job_id):
+    """Progress job import dari file checkpoint"""
+    job = voucher_io.ImportJob.load(job_id)
+    if not job:
+        abort(404)
+    return jsonify(job.state)
+
+API_MAX_PER_PAGE = 500
+API_MAX_BATCH = 1000
+
+def load_hotspot_users():
+    """Generator HotspotUser untuk snapshot API, dibaca per baris dari router"""
+    api = connect_to_mikrotik()
+    try:
+        for row in voucher_io.iter_rows(api, 'ip/hotspot/user', API_USER_FIELDS):
+            yield HotspotUser.from_row(row)
+    finally:
+        api.close()
+
+voucher_cache = VoucherCache(load_hotspot_users)
+
+def generate_random_string(length):
+    """Generate random string untuk username/password"""
+    chars = string.ascii_letters + string.digits
+    return ''.join(random.choice(chars) for _ in range(length))
+
+def api_error(message, status):
+    return jsonify({'success': False, 'message': message}), status
+
+def not_modified(etag, last_modified):
+    """Cek header conditional GET terhadap ETag/Last-Modified snapshot"""
+    if request.if_none_match:
+        return request.if_none_match.contains_weak(etag)
+    if request.if_modified_since and last_modified:
+        return request.if_modified_since.timestamp() >= int(last_modified)
+    return False
+
+def cached_response(payload, etag, last_modified):
+    response = jsonify(payload)
+    response.headers['ETag'] = f'"{etag}"'
+    response.headers['Last-Modified'] = formatdate(last_modified, usegmt=True)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+def not_modified_response(etag, last_modified):
+    response = Response(status=304)
+    response.headers['ETag'] = f'"{etag}"'
+    response.headers['Last-Modified'] = formatdate(last_modified, usegmt=True)
+    return response
+
+def find_user_id(api, name):
+    rows = api.path('ip/hotspot/user').select('.id').where(Key('name') == name)
+    row = next(iter(rows), None)
+    return row['.id'] if row else None
+
+def record_api_vouchers(vouchers):
+    """Catat voucher yang dibuat lewat API ke ledger penjualan"""
+    try:
+        voucher_ledger.record(vouchers, operator_name='web-api', source='api', prices=config.get('VOUCHER_PRICES'))
+    except Exception as e:
+        logger.error("Gagal mencatat %s voucher API ke ledger: %s", len(vouchers), e)
+
+@app.route('/api/vouchers')
+def api_list_vouchers():
+    """Daftar voucher dengan paging dan filter profile, comment, disabled, dan prefix nama"""
+    # Snapshot yang masih segar menjawab conditional GET tanpa query ke router
+    if voucher_cache.is_fresh() and not_modified(voucher_cache.etag, voucher_cache.last_modified):
+        return not_modified_response(voucher_cache.etag, voucher_cache.last_modified)
+    
+    try:
+        users, etag, last_modified = voucher_cache.get()
+    except Exception as e:
+        logger.error("Error memuat daftar voucher API: %s", e)
+        return api_error(f'Gagal terhubung ke Mikrotik: {str(e)}', 502)
+    
+    if not_modified(etag, last_modified):
+        return not_modified_response(etag, last_modified)
+    
+    page = max(request.args.get('page', 1, type=int), 1)
+    per_page = min(max(request.args.get('per_page', 50, type=int), 1), API_MAX_PER_PAGE)
+    profile = request.args.get('profile')
+    comment = request.args.get('comment')
+    prefix = request.args.get('q')
+    disabled = request.args.get('disabled')
+    
+    matches = [
+        user for user in users.values()
+        if (not profile or user.profile == profile)
+        and (not comment or user.comment == comment)
+        and (not prefix or user.name.startswith(prefix))
+        and (disabled is None or user.disabled == (disabled.lower() == 'true'))
+    ]
+    start = (page - 1) * per_page
+    return cached_response({
+        'total': len(matches),
+        'page': page,
+        'per_page': per_page,
+        # Password hanya dikirim di detail dan saat voucher dibuat
+        'vouchers': [user.as_dict(with_password=False) for user in matches[start:start + per_page]],
+    }, etag, last_modified)
+
+@app.route('/api/vouchers/<name>')
+def api_get_voucher(name):
+    """Detail satu voucher, dengan ETag per voucher"""
+    try:
+        users, _, last_modified = voucher_cache.get()
+    except Exception as e:
+        logger.error("Error memuat voucher API: %s", e)
+        return api_error(f'Gagal terhubung ke Mikrotik: {str(e)}', 502)
+    
+    user = users.get(name)
+    if not user:
+        return api_error('Voucher tidak ditemukan', 404)
+    
+    data = user.as_dict()
+    etag = hashlib.sha1(repr(data).encode('utf-8')).hexdigest()[:20]
+    if not_modified(etag, last_modified):
+        return not_modified_response(etag, last_modified)
+    return cached_response(data, etag, last_modified)
+
+@app.route('/api/vouchers', methods=['POST'])
+def api_create_voucher():
+    """Buat satu voucher; name dan password dibuat acak jika tidak diisi"""
+    data = request.get_json(silent=True) or {}
+    if not data.get('profile'):
+        return api_error('Field profile wajib diisi', 400)
+    
+    name = data.get('name') or generate_random_string(8)
+    password = data.get('password') or generate_random_string(8)
+    success, message = create_voucher(name, password, data['profile'], data.get('limit'), data.get('comment'))
+    if not success:
+        return api_error(message, 502)
+    
+    voucher_cache.invalidate()
+    record_api_vouchers([{'username': name, 'profile': data['profile'], 'limit': data.get('limit'), 'comment': data.get('comment')}])
+    return jsonify({'success': True, 'name': name, 'password': password}), 201
+
+@app.route('/api/vouchers/batch', methods=['POST'])
+def api_batch_create_vouchers():
+    """Buat banyak voucher acak sekaligus dengan perintah add yang di-pipeline"""
+    data = request.get_json(silent=True) or {}
+    count = data.get('count', 1)
+    if not data.get('profile'):
+        return api_error('Field profile wajib diisi', 400)
+    if not isinstance(count, int) or count < 1 or count > API_MAX_BATCH:
+        return api_error(f'count harus antara 1 dan {API_MAX_BATCH}', 400)
+    
+    rows = [{
+        'name': generate_random_string(8),
+        'password': generate_random_string(8),
+        'profile': data['profile'],
+        'limit-uptime': data.get('limit'),
+        'comment': data.get('comment'),
+    } for _ in range(count)]
+    
+    try:
+        api = connect_to_mikrotik()
+    except Exception as e:
+        return api_error(f'Gagal terhubung ke Mikrotik: {str(e)}', 502)
+    
+    try:
+        errors = []
+        for start in range(0, len(rows), voucher_io.IMPORT_BATCH_SIZE):
+            batch = rows[start:start + voucher_io.IMPORT_BATCH_SIZE]
+            errors.extend((start + index, message) for index, message in voucher_io.add_batch(api, 'ip/hotspot/user', batch))
+    except Exception as e:
+        logger.error("Error batch create voucher API: %s", e)
+        return api_error(str(e), 502)
+    finally:
+        api.close()
+        voucher_cache.invalidate()
+    
+    failed = {index for index, _ in errors}
+    created = [row for index, row in enumerate(rows) if index not in failed]
+    record_api_vouchers([
+        {'username': row['name'], 'profile': row['profile'], 'limit': row['limit-uptime'], 'comment': row['comment']}
+        for row in created
+    ])
+    logger.info("API membuat %s voucher, %s gagal", len(created), len(errors))
+    # 201 semua berhasil, 207 sebagian gagal, 502 jika router menolak semuanya
+    if not created:
+        status = 502
+    elif errors:
+        status = 207
+    else:
+        status = 201
+    return jsonify({
+        'success': not errors,
+        'vouchers': [{'name': row['name'], 'password': row['password']} for row in created],
+        'errors': [{'index': index, 'message': message} for index, message in errors],
+    }), status
+
+@app.route('/api/vouchers/<name>/disable', methods=['POST'])
+def api_disable_voucher(name):
+    return update_voucher_disabled(name, True)
+
+@app.route('/api/vouchers/<name>/enable', methods=['POST'])
+def api_enable_voucher(name):
+    return update_voucher_disabled(name, False)
+
+def update_voucher_disabled(name, disabled):
+    try:
+        api = connect_to_mikrotik()
+    except Exception as e:
+        return api_error(f'Gagal terhubung ke Mikrotik: {str(e)}', 502)
+    
+    try:
+        user_id = find_user_id(api, name)
+        if not user_id:
+            return api_error('Voucher tidak ditemukan', 404)
+        api.path('ip/hotspot/user').update(**{'.id': user_id, 'disabled': disabled})
+    except Exception as e:
+        logger.error("Error mengubah status voucher %s: %s", name, e)
+        return api_error(str(e), 502)
+    finally:
+        api.close()
+    
+    voucher_cache.invalidate()
+    logger.info("Voucher %s %s melalui API", name, 'dinonaktifkan' if disabled else 'diaktifkan')
+    return jsonify({'success': True, 'name': name, 'disabled': disabled})
+
+@app.route('/api/vouchers/<name>', methods=['DELETE'])
+def api_delete_voucher(name):
+    try:
+        api = connect_to_mikrotik()
+    except Exception as e:
+        return api_error(f'Gagal terhubung ke Mikrotik: {str(e)}', 502)
+    
+    try:
+        user_id = find_user_id(api, name)
+        if not user_id:
+            return api_error('Voucher tidak ditemukan', 404)
+        api.path('ip/hotspot/user').remove(user_id)
+    except Exception as e:
+        logger.error("Error menghapus voucher %s: %s", name, e)
+        return api_error(str(e), 502)
+    finally:
+        api.close()
+    
+    voucher_cache.invalidate()
+    logger.info("Voucher %s dihapus melalui API", name)
+    return jsonify({'success': True, 'name': name})
+
+def probe_router():
+    """Probe koneksi untuk circuit breaker"""
+    api = connect_to_mikrotik(bypass_breaker=True)
+    api.close()
+    return True, None
+
+router_breaker = CircuitBreaker(probe=probe_router)
+
+def connect_to_mikrotik(bypass_breaker=False):
+    """Fungsi untuk terhubung ke API Mikrotik.
+    
+    Saat circuit breaker terbuka langsung gagal dengan ConnectionError tanpa
+    menunggu timeout, kecuali bypass_breaker (dipakai test koneksi dan probe).
+    """
+    if not bypass_breaker and not router_breaker.allow():
+        raise ConnectionError(router_breaker.down_message())
+    
     api = None
     try:
         # Persiapkan argumen koneksi
@@ -165,7 +645,8 @@ def connect_to_mikrotik():
             'host': config['IP_MIKROTIK'],
             'port': int(config['PORT_API_MIKROTIK']),
             'username': config['USERNAME_MIKROTIK'],
-            'password': config['PASSWORD_MIKROTIK']
+            'password': config['PASSWORD_MIKROTIK'],
+            'timeout': 5
         }
         
         # Konfigurasi SSL jika digunakan
@@ -190,9 +671,16 @@ def connect_to_mikrotik():
         
         # Koneksi ke Mikrotik dengan argumen yang telah disiapkan
         api = librouteros.connect(**kwargs)
+        router_breaker.record_success()
         return api
+    except librouteros.exceptions.TrapError:
+        # Login ditolak (username/password salah): router masih merespons, jadi tidak
+        # dihitung sebagai kegagalan circuit breaker. ConnectionClosed/FatalError tetap dihitung.
+        logger.error("Error connecting to Mikrotik: username/password salah")
+        raise
     except Exception as e:
-        logger.error(f"Error connecting to Mikrotik: {e}")
+        logger.error("Error connecting to Mikrotik: %s", e)
+        router_breaker.record_failure(str(e))
         raise
 
 def create_voucher(username, password, profile, limit=None, comment=None):
@@ -218,10 +706,10 @@ def create_voucher(username, password, profile, limit=None, comment=None):
         api.path('ip/hotspot/user').add(**params)
         
         api.close()
-        logger.info(f"Voucher berhasil dibuat untuk username: {username}")
+        logger.info("Voucher berhasil dibuat untuk username: %s", username)
         return True, "Voucher berhasil dibuat"
     except Exception as e:
-        logger.error(f"Error creating voucher: {e}")
+        logger.error("Error creating voucher: %s", e)
         return False, str(e)
 
 if __name__ == '__main__':
@@ -229,12 +717,12 @@ if __name__ == '__main__':
     templates_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'templates')
     if not os.path.exists(templates_dir):
         os.makedirs(templates_dir)
-        logger.info(f"Membuat direktori templates: {templates_dir}")
+        logger.info("Membuat direktori templates: %s", templates_dir)
     
     # Buat file log untuk tracking
     log_file = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'app.log')
     if not os.path.exists(log_file):
         open(log_file, 'w').close()
-        logger.info(f"Membuat file log: {log_file}")
+        logger.info("Membuat file log: %s", log_file)
     
     app.run(debug=True, host='0.0.0.0', port=5000) 
\ No newline at end of file
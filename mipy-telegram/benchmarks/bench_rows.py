@@ -0,0 +1,105 @@
+"""Benchmark peak RSS untuk membaca tabel /ip/hotspot/user berukuran besar dari router.
+
+Router diganti server RouterOS palsu (benchmarks/fake_routeros.py) yang berjalan
+di proses ini, sedangkan setiap mode dijalankan sebagai client di subprocess
+terpisah agar peak RSS tidak tercampur dengan tabel milik router:
+
+    python benchmarks/bench_rows.py --rows 100000
+
+Mode:
+- list    : cara lama, list(api.path('ip/hotspot/user')) dengan semua atribut
+- select  : Query librouteros dengan .proplist, tetap menampung seluruh balasan
+- records : voucher_io.iter_rows ke list HotspotUser (seperti cache voucher API)
+- stream  : voucher_io.iter_rows, hanya 10 baris terakhir yang disimpan (seperti /list)
+"""
+import argparse
+import os
+import resource
+import subprocess
+import sys
+import time
+from collections import deque
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import librouteros
+
+import voucher_io
+from fake_routeros import FakeRouter
+from hotspot_rows import HotspotUser, USER_FIELDS
+
+MODES = ('list', 'select', 'records', 'stream')
+
+
+def read_rows(api, mode):
+    """Baca tabel user hotspot dengan cara yang dipakai mode tersebut"""
+    if mode == 'list':
+        return list(api.path('ip/hotspot/user'))
+    if mode == 'select':
+        return list(api.path('ip/hotspot/user').select(*USER_FIELDS))
+
+    rows = (HotspotUser.from_row(row) for row in voucher_io.iter_rows(api, 'ip/hotspot/user', USER_FIELDS))
+    if mode == 'records':
+        return list(rows)
+    return deque(rows, maxlen=10)
+
+
+def peak_rss_mb():
+    """Peak RSS proses ini dalam MB.
+
+    Di Linux ru_maxrss ikut terbawa dari proses induk melewati fork+exec (induk
+    menyimpan tabel router), jadi VmHWM dari /proc dipakai jika tersedia.
+    """
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    # ru_maxrss dalam KB di Linux, dalam byte di macOS
+    scale = 1024 * 1024 if sys.platform == 'darwin' else 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale
+
+
+def run_mode(mode, host, port, username, password):
+    api = librouteros.connect(host=host, port=port, username=username, password=password)
+    baseline = peak_rss_mb()
+
+    started = time.perf_counter()
+    rows = read_rows(api, mode)
+    elapsed = time.perf_counter() - started
+    api.close()
+
+    peak = peak_rss_mb()
+    print(f'{mode:8s} rows={len(rows):7d} time={elapsed:6.2f} s peak_rss={peak:8.1f} MB '
+          f'delta={peak - baseline:8.1f} MB')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--mode', choices=MODES)
+    parser.add_argument('--host', help=argparse.SUPPRESS)
+    parser.add_argument('--port', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    router = FakeRouter(users=args.rows)
+    if args.mode:
+        run_mode(args.mode, args.host, args.port, router.username, router.password)
+        return
+
+    host, port = router.start()
+    try:
+        for mode in MODES:
+            subprocess.run([
+                sys.executable, __file__, '--mode', mode, '--rows', '0', '--host', host, '--port', str(port),
+            ], check=True)
+    finally:
+        router.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+"""Periksa circuit breaker web interface dan bot terhadap server RouterOS palsu.
+
+Login yang ditolak (password salah) tidak boleh membuka breaker karena router
+masih merespons; port tertutup dan koneksi yang diputus tetap dihitung gagal:
+
+    python benchmarks/breaker_check.py
+"""
+import os
+import shutil
+import socket
+import sys
+import tempfile
+import threading
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from circuit_breaker import CircuitBreaker
+from fake_routeros import FakeRouter
+
+ATTEMPTS = 8
+
+
+def closing_server():
+    """Server yang menerima koneksi lalu langsung menutupnya (ConnectionClosed di client)"""
+    server = socket.socket()
+    server.bind(('127.0.0.1', 0))
+    server.listen(50)
+
+    def accept():
+        while True:
+            conn, _ = server.accept()
+            conn.close()
+
+    threading.Thread(target=accept, name='closing-server', daemon=True).start()
+    return server.getsockname()[1]
+
+
+def refused_port():
+    sock = socket.socket()
+    sock.bind(('127.0.0.1', 0))
+    port = sock.getsockname()[1]
+    sock.close()
+    return port
+
+
+def check_app(app, config):
+    # Breaker baru tanpa probe agar setiap kasus dimulai dari status closed
+    app.router_breaker = CircuitBreaker()
+    app.config.update(config)
+    errors = set()
+    for _ in range(ATTEMPTS):
+        try:
+            app.connect_to_mikrotik().close()
+        except Exception as e:
+            errors.add(type(e).__name__)
+    return app.router_breaker.state, ', '.join(sorted(errors)) or '-'
+
+
+def check_bot(telegram_bot, config):
+    telegram_bot.router_breaker = CircuitBreaker()
+    results = set()
+    for _ in range(ATTEMPTS):
+        api = telegram_bot.connect_to_mikrotik(config)
+        results.add('terhubung' if api else 'None')
+        if api:
+            api.close()
+    return telegram_bot.router_breaker.state, ', '.join(sorted(results))
+
+
+def main():
+    router = FakeRouter(users=10)
+    host, port = router.start()
+    cases = [
+        ('password salah', port, 'salah', 'closed'),
+        ('port tertutup', refused_port(), router.password, 'open'),
+        ('koneksi diputus', closing_server(), router.password, 'open'),
+        ('login berhasil', port, router.password, 'closed'),
+    ]
+
+    # app dan telegram_bot membaca config.json dari direktori kerja
+    original_cwd = os.getcwd()
+    workdir = tempfile.mkdtemp(prefix='mipy-breaker-')
+    os.chdir(workdir)
+    import app
+    import logging_setup
+    import telegram_bot
+
+    failed = False
+    for name, check, module in (('web', check_app, app), ('bot', check_bot, telegram_bot)):
+        for label, case_port, password, expected in cases:
+            state, detail = check(module, {
+                'IP_MIKROTIK': host,
+                'PORT_API_MIKROTIK': str(case_port),
+                'USERNAME_MIKROTIK': router.username,
+                'PASSWORD_MIKROTIK': password,
+                'USE_SSL': False,
+            })
+            status = 'OK' if state == expected else 'GAGAL'
+            failed = failed or state != expected
+            print(f'{status:5s} {name} {label:16s} breaker={state:8s} (harapan {expected}) {detail}')
+
+    router.stop()
+    logging_setup.stop_logging()
+    os.chdir(original_cwd)
+    shutil.rmtree(workdir, ignore_errors=True)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
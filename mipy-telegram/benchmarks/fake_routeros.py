@@ -0,0 +1,215 @@
+"""Server RouterOS API palsu untuk replay harness dan uji manual tanpa router.
+
+Berbicara protokol API yang sama (port 8728) sehingga kode koneksi, login, query
+.proplist/where, dan add bertag di bot berjalan tanpa diubah. Tabel disimpan di
+memori:
+
+    python benchmarks/fake_routeros.py --port 8728 --users 1000
+"""
+import argparse
+import operator
+import os
+import select
+import socketserver
+import sys
+import threading
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from librouteros.connections import SocketTransport
+from librouteros.exceptions import ConnectionClosed
+from librouteros.protocol import ApiProtocol
+
+PROFILES = ['paket1jam', 'paket3jam', 'harian', 'mingguan', 'bulanan']
+COMPARE = {'=': operator.eq, '<': operator.lt, '>': operator.gt}
+
+
+class FakeRouter:
+    """Tabel RouterOS di memori dengan perintah print, add, set, dan remove"""
+
+    def __init__(self, users=0, profiles=PROFILES, username='admin', password='admin', latency=0.0):
+        self.username = username
+        self.password = password
+        self.latency = latency
+        self.lock = threading.Lock()
+        self.commands = Counter()
+        self.next_id = 1
+        self.tables = {
+            'ip/hotspot/user/profile': [],
+            'ip/hotspot/user': [],
+            'ip/hotspot/active': [],
+            'interface': [
+                {'.id': '*1', 'name': 'ether1', 'type': 'ether', 'rx-byte': '0', 'tx-byte': '0', 'running': 'true'},
+                {'.id': '*2', 'name': 'bridge1', 'type': 'bridge', 'rx-byte': '0', 'tx-byte': '0', 'running': 'true'},
+            ],
+            'system/resource': [{
+                'uptime': '1w2d3h', 'version': '7.99 (fake)', 'cpu-load': '3',
+                'free-memory': '104857600', 'total-memory': '268435456', 'board-name': 'FakeRouter',
+            }],
+        }
+        for profile in profiles:
+            self.insert('ip/hotspot/user/profile', {'name': profile})
+        for i in range(users):
+            self.insert('ip/hotspot/user', {
+                'name': f'user{i:06d}', 'password': f'pass{i:06d}', 'profile': profiles[i % len(profiles)],
+                'limit-uptime': '1d', 'uptime': '0s', 'comment': f'batch-{i // 1000}', 'disabled': 'false',
+            })
+        self.server = None
+
+    def insert(self, path, row):
+        row = dict(row, **{'.id': f'*{self.next_id:X}'})
+        self.next_id += 1
+        self.tables.setdefault(path, []).append(row)
+        return row['.id']
+
+    def start(self, host='127.0.0.1', port=0):
+        """Jalankan server di thread background, mengembalikan (host, port)"""
+        router = self
+
+        class Handler(socketserver.BaseRequestHandler):
+            def handle(self):
+                router.serve(self.request)
+
+        socketserver.ThreadingTCPServer.allow_reuse_address = True
+        self.server = socketserver.ThreadingTCPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, name='fake-routeros', daemon=True).start()
+        return self.server.server_address
+
+    def stop(self):
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+
+    def serve(self, sock):
+        protocol = ApiProtocol(transport=SocketTransport(sock), encoding='ASCII')
+        replies = []
+        try:
+            while True:
+                cmd, words = protocol.readSentence()
+                replies.extend(self.handle(cmd, words))
+                # Latency dihitung per round trip: balasan dikirim setelah client berhenti
+                # mengirim, sehingga perintah yang di-pipeline hanya menunggu sekali
+                if not select.select([sock], [], [], 0)[0]:
+                    if self.latency:
+                        time.sleep(self.latency)
+                    for sentence in replies:
+                        protocol.writeSentence(*sentence)
+                    replies = []
+        except (ConnectionClosed, OSError):
+            pass
+
+    def handle(self, cmd, words):
+        """Jawab satu sentence, mengembalikan daftar sentence balasan"""
+        attrs, query, tag = {}, [], None
+        for word in words:
+            if word.startswith('.tag='):
+                tag = word[len('.tag='):]
+            elif word.startswith('?'):
+                query.append(word[1:])
+            elif word.startswith('='):
+                key, _, value = word[1:].partition('=')
+                attrs[key] = value
+
+        path, _, action = cmd.strip('/').rpartition('/')
+        self.commands[cmd] += 1
+        with self.lock:
+            if cmd == '/login':
+                if attrs.get('name') == self.username and attrs.get('password') == self.password:
+                    replies = [('!done',)]
+                else:
+                    replies = [('!trap', '=message=invalid user name or password (6)'), ('!done',)]
+            elif action == 'print':
+                replies = self.print_rows(path, attrs, query)
+            elif action == 'add':
+                replies = self.add_row(path, attrs)
+            elif action in ('set', 'remove'):
+                replies = self.change_row(path, action, attrs)
+            else:
+                replies = [('!trap', '=message=no such command'), ('!done',)]
+
+        if tag is not None:
+            replies = [reply + (f'.tag={tag}',) for reply in replies]
+        return replies
+
+    def print_rows(self, path, attrs, query):
+        rows = [row for row in self.tables.get(path, []) if matches(row, query)]
+        if 'count-only' in attrs:
+            return [('!done', f'=ret={len(rows)}')]
+
+        proplist = attrs['.proplist'].split(',') if attrs.get('.proplist') else None
+        replies = []
+        for row in rows:
+            keys = proplist or row.keys()
+            replies.append(('!re',) + tuple(f'={key}={row[key]}' for key in keys if key in row))
+        replies.append(('!done',))
+        return replies
+
+    def add_row(self, path, attrs):
+        rows = self.tables.setdefault(path, [])
+        if 'name' in attrs and any(row.get('name') == attrs['name'] for row in rows):
+            return [('!trap', '=message=failure: already have user with this name'), ('!done',)]
+        row = dict(attrs)
+        if path == 'ip/hotspot/user':
+            row.setdefault('uptime', '0s')
+            row.setdefault('disabled', 'false')
+        return [('!done', f'=ret={self.insert(path, row)}')]
+
+    def change_row(self, path, action, attrs):
+        rows = self.tables.get(path, [])
+        for index, row in enumerate(rows):
+            if row['.id'] == attrs.get('.id'):
+                if action == 'remove':
+                    del rows[index]
+                else:
+                    row.update((key, value) for key, value in attrs.items() if key != '.id')
+                return [('!done',)]
+        return [('!trap', '=message=no such item'), ('!done',)]
+
+
+def matches(row, query):
+    """Evaluasi query word RouterOS (?=key=value, ?key, ?-key, ?#|&!) untuk satu baris"""
+    stack = []
+    for word in query:
+        if word.startswith('#'):
+            for op in word[1:]:
+                if op == '!':
+                    stack.append(not stack.pop())
+                elif op in '|&':
+                    right, left = stack.pop(), stack.pop()
+                    stack.append(left or right if op == '|' else left and right)
+        elif word.startswith('-'):
+            stack.append(word[1:] not in row)
+        elif word[:1] in COMPARE:
+            key, _, value = word[1:].partition('=')
+            stack.append(key in row and COMPARE[word[0]](row[key], value))
+        elif '=' in word:
+            key, _, value = word.partition('=')
+            stack.append(row.get(key) == value)
+        else:
+            stack.append(word in row)
+    return all(stack)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8728)
+    parser.add_argument('--users', type=int, default=0)
+    parser.add_argument('--latency-ms', type=float, default=0)
+    args = parser.parse_args()
+
+    router = FakeRouter(users=args.users, latency=args.latency_ms / 1000)
+    host, port = router.start(args.host, args.port)
+    print(f'RouterOS palsu berjalan di {host}:{port} (login admin/admin), Ctrl+C untuk berhenti')
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        router.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,320 @@
+"""Replay update Telegram melalui dispatcher dan handler asli bot, sepenuhnya offline.
+
+Bot API diganti Request palsu dan Mikrotik diganti server RouterOS palsu
+(benchmarks/fake_routeros.py), sehingga semua handler dan ConversationHandler
+berjalan dengan kode yang sama seperti produksi:
+
+    python benchmarks/replay_harness.py --scenario voucher --operators 500
+    python benchmarks/replay_harness.py --scenario v --operators 200 --router-latency-ms 20
+    python benchmarks/replay_harness.py --replay updates.jsonl
+
+Exit code 1 jika ada exception di handler atau balasan error (❌), sehingga harness
+bisa dipakai sebagai pemeriksaan regresi. Direktori kerja sementara dihapus setelah
+selesai kecuali dengan --keep-workdir.
+
+File replay berisi satu update per baris dalam format JSON Bot API (misalnya
+isi "result" dari getUpdates). Latency diukur dari update masuk antrian sampai
+selesai diproses semua handler, termasuk waktu tunggu di antrian dispatcher.
+"""
+import argparse
+import itertools
+import json
+import os
+import queue
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter, defaultdict
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import telegram
+from telegram import Update
+from telegram.ext import Dispatcher, TypeHandler
+from telegram.utils.request import Request
+
+from fake_routeros import FakeRouter
+
+TOKEN = '123456:replay-harness'
+BOT_USER = {'id': 123456, 'is_bot': True, 'first_name': 'Replay', 'username': 'replay_bot'}
+
+# Langkah setiap operator per skenario: ('message', teks) atau ('callback', data)
+SCENARIOS = {
+    'voucher': [
+        ('message', '/voucher'),
+        ('callback', 'profile_paket1jam'),
+        ('callback', 'username_random'),
+        ('callback', 'password_random'),
+        ('message', '1h'),
+        ('message', 'none'),
+    ],
+    'v': [('message', '/v paket1jam 1h')],
+    'batch': [('message', '/v harian 1d 10 loket')],
+    'status': [('message', '/status')],
+    'list': [('message', '/list')],
+    'detail': [('message', '/detail'), ('message', 'user000001')],
+}
+
+
+class FakeBotApi(Request):
+    """Request Bot API palsu: mencatat panggilan dan mengembalikan Message sintetis"""
+
+    # Request PTB memakai __slots__; atribut baru tanpa slot memicu deprecation warning
+    __slots__ = ('latency', 'lock', 'calls', 'errors', 'last_message', 'message_ids')
+
+    def __init__(self, latency=0.0):
+        super().__init__(con_pool_size=8)
+        self.latency = latency
+        self.lock = threading.Lock()
+        self.calls = Counter()
+        self.errors = Counter()
+        self.last_message = {}
+        self.message_ids = itertools.count(1)
+
+    def post(self, url, data, timeout=None):
+        method = url.rsplit('/', 1)[-1]
+        if self.latency:
+            time.sleep(self.latency)
+
+        with self.lock:
+            self.calls[method] += 1
+            if method == 'getMe':
+                return BOT_USER
+            if 'chat_id' not in data:
+                return True
+
+            chat_id = int(data['chat_id'])
+            text = data.get('text') or data.get('caption') or ''
+            if text.startswith('❌'):
+                self.errors[text.split('\n')[0][:60]] += 1
+            message = {
+                'message_id': int(data.get('message_id') or next(self.message_ids)),
+                'date': int(time.time()),
+                'chat': {'id': chat_id, 'type': 'private'},
+                'from': BOT_USER,
+                'text': text,
+            }
+            self.last_message[chat_id] = message
+            return message
+
+
+class Operator:
+    """Satu operator sintetis yang menjalankan langkah skenario berurutan"""
+
+    def __init__(self, user_id, steps):
+        self.user = {'id': user_id, 'is_bot': False, 'first_name': f'Operator {user_id}'}
+        self.steps = list(steps)
+        self.position = 0
+
+    def next_update(self, update_id, api):
+        kind, value = self.steps[self.position]
+        self.position += 1
+        chat = {'id': self.user['id'], 'type': 'private'}
+
+        if kind == 'callback':
+            return {'update_id': update_id, 'callback_query': {
+                'id': str(update_id),
+                'from': self.user,
+                'chat_instance': str(self.user['id']),
+                'data': value,
+                'message': api.last_message.get(self.user['id']) or {
+                    'message_id': 0, 'date': int(time.time()), 'chat': chat, 'text': '',
+                },
+            }}
+
+        message = {
+            'message_id': update_id,
+            'date': int(time.time()),
+            'chat': chat,
+            'from': self.user,
+            'text': value,
+        }
+        if value.startswith('/'):
+            message['entities'] = [{'type': 'bot_command', 'offset': 0, 'length': len(value.split()[0])}]
+        return {'update_id': update_id, 'message': message}
+
+    def done(self):
+        return self.position >= len(self.steps)
+
+
+class Harness:
+    """Menjalankan dispatcher bot dengan Bot API dan RouterOS palsu di direktori sementara"""
+
+    def __init__(self, users=0, router_latency=0.0, telegram_latency=0.0, workdir=None):
+        self.router = FakeRouter(users=users, latency=router_latency)
+        host, port = self.router.start()
+
+        # Bot membaca config.json dan menulis log/ledger relatif terhadap direktori kerja
+        self.original_cwd = os.getcwd()
+        self.owns_workdir = workdir is None
+        self.workdir = workdir or tempfile.mkdtemp(prefix='mipy-replay-')
+        os.chdir(self.workdir)
+        with open('config.json', 'w') as f:
+            json.dump({
+                'IP_MIKROTIK': host,
+                'PORT_API_MIKROTIK': str(port),
+                'USERNAME_MIKROTIK': self.router.username,
+                'PASSWORD_MIKROTIK': self.router.password,
+                'USE_SSL': False,
+                'TELEGRAM_TOKEN': TOKEN,
+                'TELEGRAM_CHAT_ID': '1',
+                'NOTIFY_HOTSPOT_EVENTS': False,
+            }, f)
+
+        import telegram_bot
+
+        self.api = FakeBotApi(latency=telegram_latency)
+        self.bot = telegram.Bot(TOKEN, request=self.api)
+        self.dispatcher = Dispatcher(self.bot, queue.Queue(), workers=4)
+        telegram_bot.register_handlers(self.dispatcher)
+        self.dispatcher.add_handler(TypeHandler(Update, self.processed), group=99)
+        self.dispatcher.add_error_handler(self.handler_error)
+
+        self.lock = threading.Lock()
+        self.update_ids = itertools.count(1)
+        self.pending = {}
+        self.latencies = defaultdict(list)
+        self.handler_errors = Counter()
+        self.operators = {}
+        self.finished = threading.Event()
+        self.remaining = 0
+
+    def enqueue(self, data, label, operator=None):
+        update = Update.de_json(data, self.bot)
+        with self.lock:
+            self.pending[update.update_id] = (time.perf_counter(), label, operator)
+        self.dispatcher.update_queue.put(update)
+
+    def processed(self, update, context):
+        """Handler group terakhir: catat latency dan kirim langkah berikutnya operator"""
+        with self.lock:
+            started, label, operator = self.pending.pop(update.update_id)
+            self.latencies[label].append((time.perf_counter() - started) * 1000)
+        if operator and not operator.done():
+            self.send_step(operator)
+            return
+        with self.lock:
+            self.remaining -= 1
+            if self.remaining == 0:
+                self.finished.set()
+
+    def handler_error(self, update, context):
+        self.handler_errors[repr(context.error)[:80]] += 1
+
+    def send_step(self, operator):
+        label = operator.steps[operator.position][1].split()[0]
+        self.enqueue(operator.next_update(next(self.update_ids), self.api), label, operator)
+
+    def run_scenario(self, name, operators):
+        """Semua operator memulai bersamaan; setiap langkah dikirim setelah langkah sebelumnya selesai"""
+        self.remaining = operators
+        for index in range(operators):
+            operator = Operator(100000 + index, SCENARIOS[name])
+            self.operators[operator.user['id']] = operator
+        return self.run(lambda: [self.send_step(operator) for operator in self.operators.values()])
+
+    def run_replay(self, path):
+        """Kirim update terekam secepat mungkin, berurutan sesuai file"""
+        with open(path, 'r') as f:
+            updates = [json.loads(line) for line in f if line.strip()]
+        self.remaining = len(updates)
+
+        def send_all():
+            for data in updates:
+                if 'callback_query' in data:
+                    label = data['callback_query'].get('data', 'callback').split('_')[0] + '_'
+                else:
+                    label = (data.get('message', {}).get('text') or 'message').split()[0]
+                    label = label if label.startswith('/') else 'text'
+                self.enqueue(data, label)
+
+        return self.run(send_all)
+
+    def run(self, send):
+        thread = threading.Thread(target=self.dispatcher.start, name='dispatcher', daemon=True)
+        thread.start()
+        started = time.perf_counter()
+        send()
+        self.finished.wait()
+        elapsed = time.perf_counter() - started
+        self.dispatcher.stop()
+        self.router.stop()
+        return elapsed
+
+    def failed(self):
+        """True jika ada exception di handler atau balasan error ke operator"""
+        return bool(self.handler_errors or self.api.errors)
+
+    def cleanup(self):
+        """Tutup file log lalu hapus direktori kerja sementara (config, log, ledger)"""
+        import logging_setup
+
+        logging_setup.stop_logging()
+        os.chdir(self.original_cwd)
+        if self.owns_workdir:
+            shutil.rmtree(self.workdir, ignore_errors=True)
+
+    def report(self, elapsed):
+        total = sum(len(values) for values in self.latencies.values())
+        lines = [
+            f'{total} update diproses dalam {elapsed:.2f} s ({total / elapsed:.1f} update/s)',
+            '',
+            f"{'langkah':24s} {'jumlah':>7s} {'p50':>8s} {'p95':>8s} {'p99':>8s} {'max':>8s}  (ms)",
+        ]
+        for label, values in self.latencies.items():
+            values = sorted(values)
+            lines.append(
+                f'{label:24s} {len(values):7d} {percentile(values, 50):8.1f} {percentile(values, 95):8.1f} '
+                f'{percentile(values, 99):8.1f} {values[-1]:8.1f}'
+            )
+        lines.append('')
+        lines.append('Bot API   : ' + ', '.join(f'{k} {v}' for k, v in self.api.calls.most_common()))
+        lines.append('RouterOS  : ' + ', '.join(f'{k} {v}' for k, v in self.router.commands.most_common()))
+        for text, count in self.api.errors.most_common():
+            lines.append(f'Balasan error x{count}: {text}')
+        for error, count in self.handler_errors.most_common():
+            lines.append(f'Exception handler x{count}: {error}')
+        return '\n'.join(lines)
+
+
+def percentile(values, pct):
+    """Percentile dari list yang sudah terurut"""
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scenario', choices=sorted(SCENARIOS), default='voucher')
+    parser.add_argument('--operators', type=int, default=100)
+    parser.add_argument('--replay', help='File JSONL berisi update Telegram terekam')
+    parser.add_argument('--users', type=int, default=1000, help='Jumlah user hotspot di router palsu')
+    parser.add_argument('--router-latency-ms', type=float, default=0)
+    parser.add_argument('--telegram-latency-ms', type=float, default=0)
+    parser.add_argument('--keep-workdir', action='store_true', help='Jangan hapus direktori kerja (log, ledger)')
+    args = parser.parse_args()
+
+    replay = os.path.abspath(args.replay) if args.replay else None
+    harness = Harness(
+        users=args.users,
+        router_latency=args.router_latency_ms / 1000,
+        telegram_latency=args.telegram_latency_ms / 1000,
+    )
+    if replay:
+        elapsed = harness.run_replay(replay)
+    else:
+        elapsed = harness.run_scenario(args.scenario, args.operators)
+    print(harness.report(elapsed))
+
+    if args.keep_workdir:
+        print(f'Direktori kerja: {harness.workdir}')
+    else:
+        harness.cleanup()
+    sys.exit(1 if harness.failed() else 0)
+
+
+if __name__ == '__main__':
+    main()
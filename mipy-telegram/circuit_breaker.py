@@ -0,0 +1,90 @@
+import logging
+import random
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+CLOSED = 'closed'
+OPEN = 'open'
+
+FAILURE_THRESHOLD = 3
+PROBE_BASE_DELAY = 5
+PROBE_MAX_DELAY = 300
+
+
+class CircuitBreaker:
+    """Circuit breaker untuk koneksi ke router.
+
+    Setelah FAILURE_THRESHOLD kegagalan berturut-turut breaker terbuka: semua
+    permintaan langsung ditolak tanpa menunggu timeout, sementara thread probe
+    mencoba koneksi ulang dengan backoff eksponensial + jitter. on_state_change
+    dipanggil sekali setiap kali status berubah.
+    """
+
+    def __init__(self, probe=None, failure_threshold=FAILURE_THRESHOLD, on_state_change=None):
+        self.probe = probe
+        self.failure_threshold = failure_threshold
+        self.on_state_change = on_state_change
+        self.lock = threading.Lock()
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self.last_error = None
+
+    def allow(self):
+        return self.state == CLOSED
+
+    def record_success(self):
+        with self.lock:
+            self.failures = 0
+            if self.state == CLOSED:
+                return
+            self.state = CLOSED
+            down_since = self.opened_at
+            self.opened_at = None
+        logger.info("Router kembali online, circuit breaker ditutup")
+        self.notify(CLOSED, down_since)
+
+    def record_failure(self, error):
+        with self.lock:
+            self.failures += 1
+            self.last_error = error
+            if self.state == OPEN or self.failures < self.failure_threshold:
+                return
+            self.state = OPEN
+            self.opened_at = time.time()
+        logger.warning("Circuit breaker dibuka setelah %s kegagalan: %s", self.failures, error)
+        self.notify(OPEN, self.opened_at)
+        if self.probe:
+            threading.Thread(target=self.probe_loop, name='router-probe', daemon=True).start()
+
+    def probe_loop(self):
+        attempt = 0
+        while self.state == OPEN:
+            delay = min(PROBE_MAX_DELAY, PROBE_BASE_DELAY * 2 ** attempt)
+            time.sleep(delay * random.uniform(0.5, 1.5))
+            attempt += 1
+            try:
+                ok, error = self.probe()
+            except Exception as e:
+                ok, error = False, str(e)
+            if ok:
+                self.record_success()
+            else:
+                with self.lock:
+                    self.last_error = error
+                logger.info("Probe router ke-%s gagal: %s", attempt, error)
+
+    def notify(self, state, since):
+        if not self.on_state_change:
+            return
+        try:
+            self.on_state_change(state, since, self.last_error)
+        except Exception as e:
+            logger.error("Gagal mengirim notifikasi perubahan status router: %s", e)
+
+    def down_message(self):
+        """Pesan status singkat saat breaker terbuka"""
+        since = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(self.opened_at))
+        return f"Router tidak dapat dihubungi sejak {since} ({self.last_error})"
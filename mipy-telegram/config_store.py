@@ -0,0 +1,195 @@
+"""Penyimpanan config.json, terenkripsi jika kunci tersedia.
+
+Kunci diambil dari environment MIPY_CONFIG_KEY (passphrase, diturunkan dengan
+PBKDF2) atau dari file kunci Fernet (MIPY_CONFIG_KEYFILE, default config.key).
+Tanpa kunci, config disimpan sebagai JSON biasa seperti sebelumnya.
+
+    python config_store.py genkey                  buat config.key
+    python config_store.py encrypt                 enkripsi config.json yang ada
+    python config_store.py show                    tampilkan isi config
+    python config_store.py set KEY '<nilai JSON>'  ubah satu nilai config
+"""
+import base64
+import functools
+import json
+import logging
+import os
+import sys
+import threading
+
+from dotenv import load_dotenv
+
+# cryptography hanya dibutuhkan jika config dienkripsi
+try:
+    from cryptography.fernet import Fernet, InvalidToken
+    from cryptography.hazmat.primitives import hashes
+    from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
+except ImportError:
+    Fernet = None
+
+logger = logging.getLogger(__name__)
+
+CONFIG_FILE = 'config.json'
+KEY_ENV = 'MIPY_CONFIG_KEY'
+KEYFILE_ENV = 'MIPY_CONFIG_KEYFILE'
+DEFAULT_KEYFILE = 'config.key'
+KDF_ITERATIONS = 390000
+FORMAT = 'fernet-v1'
+
+# Hasil dekripsi terakhir; dipakai ulang selama mtime dan ukuran file tidak berubah
+_lock = threading.Lock()
+_snapshot = {'signature': None, 'config': None, 'salt': None}
+
+
+class ConfigError(Exception):
+    """Config terenkripsi tidak dapat dibaca atau ditulis (kunci salah/tidak ada)"""
+
+
+def key_source():
+    """Kembalikan (jenis kdf, rahasia) dari environment atau file kunci, atau (None, None)"""
+    passphrase = os.environ.get(KEY_ENV)
+    if passphrase:
+        return 'pbkdf2-sha256', passphrase
+
+    keyfile = os.environ.get(KEYFILE_ENV, DEFAULT_KEYFILE)
+    if os.path.exists(keyfile):
+        with open(keyfile, 'rb') as f:
+            return 'keyfile', f.read().strip()
+    return None, None
+
+
+@functools.lru_cache(maxsize=8)
+def derive_key(passphrase, salt, iterations=KDF_ITERATIONS):
+    """PBKDF2 sengaja lambat; hasilnya di-cache agar hanya dihitung sekali per proses"""
+    kdf = PBKDF2HMAC(algorithm=hashes.SHA256(), length=32, salt=salt, iterations=iterations)
+    return base64.urlsafe_b64encode(kdf.derive(passphrase.encode('utf-8')))
+
+
+def fernet_for(kdf, secret, salt=None, iterations=KDF_ITERATIONS):
+    if Fernet is None:
+        raise ConfigError("Paket cryptography belum terpasang (pip install cryptography)")
+    try:
+        if kdf == 'keyfile':
+            return Fernet(secret)
+        return Fernet(derive_key(secret, salt, iterations))
+    except ValueError as e:
+        raise ConfigError(f"Kunci config tidak valid: {e}")
+
+
+def decode(data):
+    """Parse isi file config, mendekripsinya jika terenkripsi. Mengembalikan (config, salt)"""
+    document = json.loads(data)
+    if not isinstance(document, dict) or document.get('encrypted') != FORMAT:
+        return document, None
+
+    kdf, secret = key_source()
+    if not kdf:
+        raise ConfigError(f"Config terenkripsi tetapi kunci tidak ditemukan ({KEY_ENV} atau {KEYFILE_ENV})")
+    if kdf != document.get('kdf'):
+        raise ConfigError(f"Config dienkripsi dengan {document.get('kdf')}, tetapi kunci yang tersedia {kdf}")
+
+    salt = base64.b64decode(document['salt']) if document.get('salt') else None
+    fernet = fernet_for(kdf, secret, salt, document.get('iterations', KDF_ITERATIONS))
+    try:
+        return json.loads(fernet.decrypt(document['token'].encode('ascii'))), salt
+    except InvalidToken:
+        raise ConfigError("Kunci config salah atau file config rusak")
+
+
+def is_encrypted(path=CONFIG_FILE):
+    """True jika file config yang ada sudah terenkripsi"""
+    try:
+        with open(path, 'rb') as f:
+            document = json.loads(f.read())
+    except (OSError, ValueError):
+        return False
+    return isinstance(document, dict) and document.get('encrypted') == FORMAT
+
+
+def load(path=CONFIG_FILE):
+    """Baca config; dekripsi hanya dilakukan ulang jika file berubah sejak pembacaan terakhir"""
+    stat = os.stat(path)
+    signature = (os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+    with _lock:
+        if _snapshot['signature'] != signature:
+            with open(path, 'rb') as f:
+                config, salt = decode(f.read())
+            _snapshot.update(signature=signature, config=config, salt=salt)
+            logger.debug("Config dibaca ulang dari %s", path)
+        return dict(_snapshot['config'])
+
+
+def save(config, path=CONFIG_FILE):
+    """Tulis config secara atomik (mode 600), terenkripsi jika kunci tersedia.
+
+    Config terenkripsi tidak pernah ditimpa dengan JSON biasa saat kunci tidak ada.
+    """
+    data = json.dumps(config)
+    salt = None
+
+    kdf, secret = key_source()
+    if not kdf and is_encrypted(path):
+        raise ConfigError(f"{path} terenkripsi tetapi kunci tidak ditemukan ({KEY_ENV} atau {KEYFILE_ENV}); file tidak ditimpa")
+    if kdf:
+        if kdf == 'pbkdf2-sha256':
+            # Pakai ulang salt yang ada agar kunci hasil KDF tetap dari cache
+            salt = _snapshot['salt'] or os.urandom(16)
+        token = fernet_for(kdf, secret, salt).encrypt(data.encode('utf-8')).decode('ascii')
+        document = {'encrypted': FORMAT, 'kdf': kdf, 'token': token}
+        if salt:
+            document.update(salt=base64.b64encode(salt).decode('ascii'), iterations=KDF_ITERATIONS)
+        data = json.dumps(document)
+
+    temp_path = f'{path}.tmp'
+    fd = os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, 'w') as f:
+        f.write(data)
+    os.replace(temp_path, path)
+
+    stat = os.stat(path)
+    with _lock:
+        _snapshot.update(
+            signature=(os.path.abspath(path), stat.st_mtime_ns, stat.st_size),
+            config=dict(config),
+            salt=salt,
+        )
+
+
+def main():
+    load_dotenv()
+    command = sys.argv[1] if len(sys.argv) > 1 else None
+
+    if command == 'genkey':
+        keyfile = os.environ.get(KEYFILE_ENV, DEFAULT_KEYFILE)
+        if os.path.exists(keyfile):
+            sys.exit(f"{keyfile} sudah ada, tidak ditimpa")
+        if Fernet is None:
+            sys.exit("Paket cryptography belum terpasang (pip install cryptography)")
+        fd = os.open(keyfile, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        with os.fdopen(fd, 'wb') as f:
+            f.write(Fernet.generate_key())
+        print(f"Kunci dibuat di {keyfile}. Simpan salinannya di tempat aman.")
+    elif command == 'encrypt':
+        if not key_source()[0]:
+            sys.exit(f"Kunci tidak ditemukan. Jalankan 'python config_store.py genkey' atau set {KEY_ENV}")
+        save(load())
+        print(f"{CONFIG_FILE} sudah dienkripsi")
+    elif command == 'show':
+        print(json.dumps(load(), indent=2))
+    elif command == 'set' and len(sys.argv) == 4:
+        config = load()
+        try:
+            config[sys.argv[2]] = json.loads(sys.argv[3])
+        except ValueError:
+            config[sys.argv[2]] = sys.argv[3]
+        save(config)
+        print(f"{sys.argv[2]} disimpan")
+    else:
+        sys.exit(__doc__)
+
+
+if __name__ == '__main__':
+    try:
+        main()
+    except (ConfigError, FileNotFoundError) as e:
+        sys.exit(f"Error: {e}")
@@ -0,0 +1,168 @@
+import io
+import logging
+import threading
+import time
+from collections import deque, namedtuple
+
+# Pillow hanya dibutuhkan untuk gambar sparkline
+try:
+    from PIL import Image, ImageDraw
+except ImportError:
+    Image = None
+
+logger = logging.getLogger(__name__)
+
+SAMPLE_INTERVAL = 30
+HISTORY_SIZE = 120
+SPARK_CHARS = '▁▂▃▄▅▆▇█'
+# Tanpa daftar interface uplink, hanya interface fisik yang dihitung: bridge, VLAN, dan
+# interface virtual lain membawa trafik yang sama dengan port anggotanya
+PHYSICAL_TYPES = ('ether',)
+
+Sample = namedtuple('Sample', [
+    'time', 'cpu_load', 'free_memory', 'total_memory', 'rx_bps', 'tx_bps', 'active_users',
+])
+
+
+class HealthSampler:
+    """Mengambil statistik router secara berkala ke ring buffer di memori.
+
+    Satu koneksi API dipakai ulang untuk semua sampel, sehingga biaya sampling
+    tetap sama berapa pun jumlah user yang menjalankan /status. Trafik dihitung
+    dari `interfaces` (nama interface WAN/uplink) jika diisi, atau dari semua
+    interface fisik yang berjalan.
+    """
+
+    def __init__(self, connect, interval=SAMPLE_INTERVAL, history_size=HISTORY_SIZE, interfaces=None):
+        self.connect = connect
+        self.interval = interval
+        self.interfaces = set(interfaces or ())
+        self.samples = deque(maxlen=history_size)
+        self.info = {}
+        self.lock = threading.Lock()
+        self.running = False
+        self.api = None
+        self.last_counters = None
+
+    def start(self):
+        self.running = True
+        threading.Thread(target=self.run, name='health-sampler', daemon=True).start()
+
+    def stop(self):
+        self.running = False
+
+    def run(self):
+        while self.running:
+            started = time.monotonic()
+            try:
+                if not self.api:
+                    self.api = self.connect()
+                if self.api:
+                    self.sample(self.api)
+            except Exception as e:
+                logger.error("Error mengambil sampel kesehatan router: %s", e)
+                self.reset_connection()
+            time.sleep(max(0, self.interval - (time.monotonic() - started)))
+
+    def reset_connection(self):
+        if self.api:
+            try:
+                self.api.close()
+            except Exception:
+                pass
+        self.api = None
+        self.last_counters = None
+
+    def sample(self, api):
+        resource = next(iter(api.path('system/resource').select(
+            'cpu-load', 'free-memory', 'total-memory', 'uptime', 'version', 'board-name'
+        )), {})
+        now = time.time()
+
+        counters = {}
+        for interface in api.path('interface').select('name', 'type', 'rx-byte', 'tx-byte', 'running'):
+            if self.counted(interface):
+                counters[interface['name']] = (int(interface.get('rx-byte', 0)), int(interface.get('tx-byte', 0)))
+
+        rx_bps = tx_bps = 0
+        if self.last_counters:
+            last_time, last = self.last_counters
+            elapsed = now - last_time
+            if elapsed > 0:
+                # Selisih per interface: interface yang baru muncul tidak menimbulkan lonjakan,
+                # dan counter yang turun (interface di-reset) diabaikan
+                for name, (rx, tx) in counters.items():
+                    if name in last:
+                        rx_bps += max(0, rx - last[name][0]) * 8 / elapsed
+                        tx_bps += max(0, tx - last[name][1]) * 8 / elapsed
+        self.last_counters = (now, counters)
+
+        count = next(iter(api.path('ip/hotspot/active')('print', **{'count-only': ''})), {})
+
+        sample = Sample(
+            time=now,
+            cpu_load=int(resource.get('cpu-load', 0)),
+            free_memory=int(resource.get('free-memory', 0)),
+            total_memory=int(resource.get('total-memory', 0)),
+            rx_bps=rx_bps,
+            tx_bps=tx_bps,
+            active_users=int(count.get('ret', 0)),
+        )
+        with self.lock:
+            self.samples.append(sample)
+            self.info = {
+                'version': resource.get('version', 'unknown'),
+                'uptime': resource.get('uptime', 'unknown'),
+                'board': resource.get('board-name', 'unknown'),
+            }
+
+    def counted(self, interface):
+        """Apakah trafik interface ini dihitung dalam rx_bps/tx_bps"""
+        if self.interfaces:
+            return interface.get('name') in self.interfaces
+        return bool(interface.get('running')) and interface.get('type') in PHYSICAL_TYPES
+
+    def snapshot(self):
+        """Salinan sampel dan info terakhir tanpa menahan lock lebih lama dari perlu"""
+        with self.lock:
+            return list(self.samples), dict(self.info)
+
+
+def trend(samples, field):
+    """Nilai (min, avg, max) untuk satu kolom sampel"""
+    values = [getattr(sample, field) for sample in samples]
+    return min(values), sum(values) / len(values), max(values)
+
+
+def sparkline(values):
+    """Sparkline teks dari deretan angka"""
+    values = list(values)
+    if not values:
+        return ''
+    low, high = min(values), max(values)
+    span = (high - low) or 1
+    return ''.join(SPARK_CHARS[int((value - low) / span * (len(SPARK_CHARS) - 1))] for value in values)
+
+
+def sparkline_image(samples, width=400, height=120):
+    """Gambar PNG berisi grafik CPU (biru) dan user aktif (hijau), atau None tanpa Pillow"""
+    if Image is None or len(samples) < 2:
+        return None
+
+    image = Image.new('RGB', (width, height), 'white')
+    draw = ImageDraw.Draw(image)
+    step = (width - 10) / (len(samples) - 1)
+
+    for field, color in (('cpu_load', 'blue'), ('active_users', 'green')):
+        values = [getattr(sample, field) for sample in samples]
+        high = max(values) or 1
+        points = [
+            (5 + index * step, height - 5 - (value / high) * (height - 10))
+            for index, value in enumerate(values)
+        ]
+        draw.line(points, fill=color, width=2)
+
+    buffer = io.BytesIO()
+    image.save(buffer, format='PNG')
+    buffer.seek(0)
+    return buffer
@@ -0,0 +1,106 @@
+import sys
+
+# Kolom yang diminta dari router (.proplist) untuk setiap jenis baris
+USER_FIELDS = ('.id', 'name', 'profile', 'limit-uptime', 'uptime', 'comment', 'disabled')
+API_USER_FIELDS = USER_FIELDS + ('password',)
+ACTIVE_FIELDS = ('.id', 'user', 'address', 'uptime', 'session-time-left', 'bytes-in', 'bytes-out')
+
+
+def is_true(value):
+    """Nilai boolean RouterOS: True dari Query, 'true'/'yes' dari baris mentah iter_rows"""
+    return value in (True, 'true', 'yes')
+
+
+def intern_text(value):
+    """Intern string yang sering berulang (nama profile) agar hanya disimpan sekali"""
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+class HotspotUser:
+    """Baris /ip/hotspot/user yang ringkas, tanpa overhead dict per baris"""
+
+    __slots__ = ('id', 'name', 'profile', 'limit_uptime', 'uptime', 'comment', 'disabled', 'password')
+
+    def __init__(self, id, name, profile, limit_uptime=None, uptime=None, comment=None, disabled=False, password=None):
+        self.id = id
+        self.name = name
+        self.profile = intern_text(profile)
+        self.limit_uptime = intern_text(limit_uptime)
+        self.uptime = uptime
+        self.comment = comment
+        self.disabled = disabled
+        self.password = password
+
+    @classmethod
+    def from_row(cls, row):
+        return cls(
+            row.get('.id'),
+            row.get('name'),
+            row.get('profile'),
+            row.get('limit-uptime'),
+            row.get('uptime'),
+            row.get('comment'),
+            is_true(row.get('disabled')),
+            row.get('password'),
+        )
+
+    def as_dict(self, with_password=True):
+        data = {
+            'id': self.id,
+            'name': self.name,
+            'password': self.password,
+            'profile': self.profile,
+            'limit_uptime': self.limit_uptime,
+            'uptime': self.uptime,
+            'comment': self.comment,
+            'disabled': self.disabled,
+        }
+        if not with_password:
+            del data['password']
+        return data
+
+
+class ActiveSession:
+    """Baris /ip/hotspot/active yang ringkas untuk cache sesi aktif"""
+
+    __slots__ = ('id', 'user', 'address', 'uptime', 'session_time_left', 'bytes_in', 'bytes_out')
+
+    def __init__(self, id, user, address=None, uptime=None, session_time_left=None, bytes_in=0, bytes_out=0):
+        self.id = id
+        self.user = user
+        self.address = address
+        self.uptime = uptime
+        self.session_time_left = session_time_left
+        self.bytes_in = bytes_in
+        self.bytes_out = bytes_out
+
+    @classmethod
+    def from_row(cls, row):
+        session = cls(row.get('.id'), row.get('user'))
+        session.update(row)
+        return session
+
+    def update(self, row):
+        """Perbarui kolom dari event listen (yang hanya berisi kolom yang berubah)"""
+        if 'address' in row:
+            self.address = row['address']
+        if 'uptime' in row:
+            self.uptime = row['uptime']
+        if 'session-time-left' in row:
+            self.session_time_left = row['session-time-left']
+        if 'bytes-in' in row:
+            self.bytes_in = row['bytes-in']
+        if 'bytes-out' in row:
+            self.bytes_out = row['bytes-out']
+
+    def as_row(self):
+        """Kembalikan dalam bentuk dict seperti baris API, untuk kode yang memakai .get()"""
+        return {
+            '.id': self.id,
+            'user': self.user,
+            'address': self.address,
+            'uptime': self.uptime,
+            'session-time-left': self.session_time_left,
+            'bytes-in': self.bytes_in,
+            'bytes-out': self.bytes_out,
+        }
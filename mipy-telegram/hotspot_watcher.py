@@ -0,0 +1,228 @@
+import logging
+import re
+import select
+import socket
+import threading
+import time
+
+import librouteros
+from librouteros.query import Key
+
+from hotspot_rows import ACTIVE_FIELDS, ActiveSession
+
+logger = logging.getLogger(__name__)
+
+# Sesi listen dibiarkan terbuka selama router sepi; thread memeriksa flag running setiap
+# IDLE_POLL detik, dan keepalive TCP mendeteksi koneksi yang mati tanpa login ulang
+IDLE_POLL = 30
+# Batas waktu membaca satu sentence yang sudah mulai diterima
+READ_TIMEOUT = 30
+KEEPALIVE_IDLE = 60
+KEEPALIVE_INTERVAL = 20
+KEEPALIVE_COUNT = 3
+RECONNECT_DELAY = 10
+MAX_EVENTS_PER_MESSAGE = 50
+
+DURATION_PATTERN = re.compile(r'(\d+)([wdhms])')
+DURATION_UNITS = {'w': 604800, 'd': 86400, 'h': 3600, 'm': 60, 's': 1}
+
+
+def parse_duration(value):
+    """Konversi durasi RouterOS (contoh: 1w2d, 3h4m5s, 1d02:03:04) menjadi detik"""
+    if value is None or value == '':
+        return None
+    if isinstance(value, int):
+        return value
+
+    value = str(value).strip()
+    seconds = 0
+
+    # Format jam:menit:detik di akhir string (contoh: 1d02:03:04)
+    if ':' in value:
+        prefix, clock = value[:-8], value[-8:]
+        hours, minutes, secs = (int(part) for part in clock.split(':'))
+        seconds += hours * 3600 + minutes * 60 + secs
+        value = prefix
+
+    for amount, unit in DURATION_PATTERN.findall(value):
+        seconds += int(amount) * DURATION_UNITS[unit]
+    return seconds
+
+
+def enable_keepalive(sock):
+    """Aktifkan TCP keepalive agar koneksi yang putus terdeteksi meski tidak ada event"""
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+    for option, value in (
+        ('TCP_KEEPIDLE', KEEPALIVE_IDLE),
+        ('TCP_KEEPINTVL', KEEPALIVE_INTERVAL),
+        ('TCP_KEEPCNT', KEEPALIVE_COUNT),
+    ):
+        if hasattr(socket, option):
+            sock.setsockopt(socket.IPPROTO_TCP, getattr(socket, option), value)
+
+
+def wait_readable(sock, timeout):
+    """True jika ada data untuk dibaca, termasuk data yang sudah didekripsi di buffer TLS"""
+    pending = getattr(sock, 'pending', None)
+    if pending and pending():
+        return True
+    return bool(select.select([sock], [], [], timeout)[0])
+
+
+class HotspotWatcher:
+    """Mendengarkan perubahan /ip/hotspot/active lewat satu sesi listen yang panjang.
+
+    Event login/logout dikumpulkan dan diambil per interval melalui drain()
+    untuk dikirim sebagai satu pesan. Data sesi aktif juga disimpan agar handler lain tidak perlu
+    query ke Mikrotik.
+    """
+
+    def __init__(self, connect):
+        self.connect = connect
+        self.lock = threading.Lock()
+        self.active = {}
+        self.events = []
+        self.seeded = False
+        self.synced = False
+        self.running = False
+        self.thread = None
+
+    def start(self):
+        self.running = True
+        self.thread = threading.Thread(target=self.run, name='hotspot-watcher', daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.running = False
+
+    def run(self):
+        while self.running:
+            api = None
+            try:
+                # connect() di dalam try: satu exception tidak boleh menghentikan thread ini
+                api = self.connect()
+                if not api:
+                    self.synced = False
+                    time.sleep(RECONNECT_DELAY)
+                    continue
+                self.seed(api)
+                self.listen(api)
+            except (librouteros.exceptions.ConnectionClosed, librouteros.exceptions.FatalError, OSError) as e:
+                logger.error("Sesi listen hotspot terputus: %s", e)
+                time.sleep(RECONNECT_DELAY)
+            except Exception as e:
+                logger.error("Error pada hotspot watcher: %s", e)
+                time.sleep(RECONNECT_DELAY)
+            finally:
+                self.synced = False
+                if api:
+                    try:
+                        api.close()
+                    except Exception:
+                        pass
+
+    def seed(self, api):
+        """Isi ulang data sesi aktif sebelum listen agar logout dapat dikenali.
+
+        Saat menyambung ulang, data baru dibandingkan dengan data sebelumnya sehingga
+        login/logout yang terjadi selama koneksi terputus tetap dinotifikasi.
+        """
+        rows = api.path('ip/hotspot/active').select(*ACTIVE_FIELDS)
+        active = {row['.id']: ActiveSession.from_row(row) for row in rows}
+        with self.lock:
+            if self.seeded:
+                missed = []
+                for session_id, previous in self.active.items():
+                    current = active.get(session_id)
+                    if current is None or current.user != previous.user:
+                        missed.append(('logout', previous))
+                for session_id, session in active.items():
+                    previous = self.active.get(session_id)
+                    if previous is None or previous.user != session.user:
+                        missed.append(('login', session))
+                if missed:
+                    logger.info("%s event hotspot terjadi selama sesi listen terputus", len(missed))
+                self.events.extend(missed)
+            self.active = active
+            self.seeded = True
+
+    def listen(self, api):
+        sock = api.protocol.transport.sock
+        enable_keepalive(sock)
+        sock.settimeout(READ_TIMEOUT)
+        api.protocol.writeSentence('/ip/hotspot/active/listen')
+        self.synced = True
+        logger.info("Hotspot watcher mulai mendengarkan /ip/hotspot/active")
+
+        while self.running:
+            # Router sepi bukan alasan untuk login ulang: tetap di sesi yang sama
+            if not wait_readable(sock, IDLE_POLL):
+                continue
+            reply_word, row = api.readSentence()
+            if reply_word == '!trap':
+                raise librouteros.exceptions.TrapError(**row)
+            if reply_word == '!done':
+                return
+            if reply_word == '!re':
+                self.handle(row)
+
+    def handle(self, row):
+        session_id = row.get('.id')
+        with self.lock:
+            if row.get('.dead'):
+                previous = self.active.pop(session_id, None)
+                if previous:
+                    self.events.append(('logout', previous))
+            elif session_id in self.active:
+                self.active[session_id].update(row)
+            else:
+                session = ActiveSession.from_row(row)
+                self.active[session_id] = session
+                self.events.append(('login', session))
+
+    def get_active(self, username):
+        """Data sesi aktif untuk username, atau None jika sedang offline"""
+        with self.lock:
+            for session in self.active.values():
+                if session.user == username:
+                    return session.as_row()
+        return None
+
+    def drain(self):
+        with self.lock:
+            events, self.events = self.events, []
+        return events
+
+
+def find_limit_reached(api, usernames):
+    """Username yang logout karena waktu terpakai sudah mencapai limit-uptime"""
+    reached = set()
+    if not usernames:
+        return reached
+
+    names = sorted(usernames)
+    rows = api.path('ip/hotspot/user').select('name', 'uptime', 'limit-uptime').where(Key('name').In(*names))
+    for row in rows:
+        limit = parse_duration(row.get('limit-uptime'))
+        uptime = parse_duration(row.get('uptime'))
+        if limit and uptime is not None and uptime >= limit:
+            reached.add(row['name'])
+    return reached
+
+
+def format_events(events, limit_reached):
+    """Susun event login/logout menjadi satu pesan notifikasi"""
+    lines = []
+    for kind, session in events:
+        username = session.user or 'N/A'
+        if kind == 'login':
+            lines.append(f"🟢 Login: {username} ({session.address or 'N/A'})")
+        elif username in limit_reached:
+            lines.append(f"⛔ Limit tercapai: {username}")
+        else:
+            lines.append(f"🔴 Logout: {username}")
+
+    message = "🔔 Aktivitas Hotspot\n\n" + "\n".join(lines[:MAX_EVENTS_PER_MESSAGE])
+    if len(lines) > MAX_EVENTS_PER_MESSAGE:
+        message += f"\n... dan {len(lines) - MAX_EVENTS_PER_MESSAGE} event lainnya"
+    return message
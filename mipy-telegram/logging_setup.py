@@ -0,0 +1,159 @@
+import atexit
+import contextvars
+import json
+import logging
+import logging.handlers
+import queue
+import re
+import time
+import uuid
+
+# Ukuran maksimal file log sebelum dirotasi
+LOG_MAX_BYTES = 5 * 1024 * 1024
+LOG_BACKUP_COUNT = 5
+
+REDACTED = '***'
+
+# Pola kredensial yang selalu disamarkan dari pesan log
+SECRET_PATTERNS = [
+    re.compile(r'(?i)\b(password|passwd|pass|token|secret)(["\']?\s*[=:]\s*["\']?)[^\s,"\'}]+'),
+    re.compile(r'\b\d{6,}:[A-Za-z0-9_-]{30,}\b'),
+]
+
+request_id_var = contextvars.ContextVar('request_id', default=None)
+request_started_var = contextvars.ContextVar('request_started', default=None)
+
+_secrets = set()
+_listener = None
+
+
+def register_secret(value):
+    """Daftarkan nilai rahasia (password, token) agar selalu disamarkan dari log"""
+    if value and len(str(value)) >= 4:
+        _secrets.add(str(value))
+
+
+def redact(text):
+    for secret in _secrets:
+        if secret in text:
+            text = text.replace(secret, REDACTED)
+    for pattern in SECRET_PATTERNS:
+        if pattern.groups:
+            text = pattern.sub(lambda m: m.group(1) + m.group(2) + REDACTED, text)
+        else:
+            text = pattern.sub(REDACTED, text)
+    return text
+
+
+def new_request_id():
+    """Buat request ID baru untuk konteks yang sedang berjalan"""
+    request_id = uuid.uuid4().hex[:12]
+    request_id_var.set(request_id)
+    request_started_var.set(time.perf_counter())
+    return request_id
+
+
+def request_duration_ms():
+    """Durasi sejak new_request_id() dipanggil, dalam milidetik"""
+    started = request_started_var.get()
+    if started is None:
+        return None
+    return round((time.perf_counter() - started) * 1000, 2)
+
+
+def clear_request_id():
+    request_id_var.set(None)
+    request_started_var.set(None)
+
+
+class JsonFormatter(logging.Formatter):
+    """Format record log sebagai satu baris JSON dengan kredensial disamarkan"""
+
+    def format(self, record):
+        entry = {
+            'time': self.formatTime(record, '%Y-%m-%dT%H:%M:%S'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': redact(record.getMessage()),
+        }
+        request_id = getattr(record, 'request_id', None)
+        if request_id:
+            entry['request_id'] = request_id
+        duration_ms = getattr(record, 'duration_ms', None)
+        if duration_ms is not None:
+            entry['duration_ms'] = duration_ms
+        if record.exc_info:
+            entry['exc_info'] = redact(self.formatException(record.exc_info))
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class ContextQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler yang tidak memformat pesan di thread pemanggil.
+
+    Formatting, redaksi, dan penulisan file dilakukan oleh thread listener;
+    di thread pemanggil hanya request ID yang ditempelkan ke record.
+    """
+
+    def prepare(self, record):
+        if not hasattr(record, 'request_id'):
+            record.request_id = request_id_var.get()
+        return record
+
+
+def setup_logging(filename, level=logging.INFO):
+    """Pasang pipeline logging: QueueHandler -> thread listener -> file JSON berotasi"""
+    global _listener
+    if _listener:
+        return
+
+    file_handler = logging.handlers.RotatingFileHandler(
+        filename, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUP_COUNT, encoding='utf-8'
+    )
+    file_handler.setFormatter(JsonFormatter())
+
+    log_queue = queue.SimpleQueue()
+    _listener = logging.handlers.QueueListener(log_queue, file_handler, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
+
+    root = logging.getLogger()
+    root.setLevel(level)
+    root.addHandler(ContextQueueHandler(log_queue))
+
+
+def stop_logging():
+    """Hentikan listener dan tutup file log, misalnya sebelum direktori log dihapus"""
+    global _listener
+    if not _listener:
+        return
+
+    atexit.unregister(_listener.stop)
+    _listener.stop()
+    for handler in _listener.handlers:
+        handler.close()
+    _listener = None
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        if isinstance(handler, ContextQueueHandler):
+            root.removeHandler(handler)
+
+
+class log_duration:
+    """Context manager untuk mencatat durasi sebuah operasi dalam milidetik"""
+
+    def __init__(self, logger, message, *args, level=logging.INFO):
+        self.logger = logger
+        self.message = message
+        self.args = args
+        self.level = level
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.logger.isEnabledFor(self.level):
+            duration_ms = round((time.perf_counter() - self.start) * 1000, 2)
+            self.logger.log(self.level, self.message, *self.args, extra={'duration_ms': duration_ms})
+        return False
@@ -0,0 +1,213 @@
+import cProfile
+import contextvars
+import functools
+import glob
+import io
+import json
+import logging
+import os
+import pstats
+import time
+from contextlib import contextmanager
+
+from librouteros.api import Api
+from librouteros.login import plain
+from telegram.ext import ConversationHandler
+from telegram.utils.request import Request
+
+logger = logging.getLogger(__name__)
+
+TRACES_DIR = 'traces'
+MAX_TRACES = 50
+THRESHOLD_MS = 1000
+PSTATS_LIMIT = 30
+
+# Pengaturan aktif; diisi dari config lewat configure() dan bisa diubah dengan /profile
+settings = {'enabled': False, 'threshold_ms': THRESHOLD_MS, 'cprofile': True}
+
+# Span yang sedang berjalan di thread handler ini (None jika profiling tidak aktif)
+current_span = contextvars.ContextVar('current_span', default=None)
+
+
+class Span:
+    """Satu fase dalam penanganan command, dengan sub-fase sebagai children"""
+
+    __slots__ = ('name', 'started', 'duration_ms', 'children')
+
+    def __init__(self, name):
+        self.name = name
+        self.started = time.perf_counter()
+        self.duration_ms = None
+        self.children = []
+
+    def finish(self):
+        self.duration_ms = round((time.perf_counter() - self.started) * 1000, 2)
+
+    def as_dict(self):
+        return {
+            'name': self.name,
+            'duration_ms': self.duration_ms,
+            'children': [child.as_dict() for child in self.children],
+        }
+
+
+def configure(config):
+    """Baca PROFILING_ENABLED, PROFILING_THRESHOLD_MS, dan PROFILING_CPROFILE dari config"""
+    settings['enabled'] = bool(config.get('PROFILING_ENABLED', False))
+    settings['threshold_ms'] = int(config.get('PROFILING_THRESHOLD_MS', THRESHOLD_MS))
+    settings['cprofile'] = bool(config.get('PROFILING_CPROFILE', True))
+
+
+@contextmanager
+def span(name):
+    """Catat durasi satu fase; tidak melakukan apa-apa di luar handler yang diprofil"""
+    parent = current_span.get()
+    if parent is None:
+        yield
+        return
+
+    child = Span(name)
+    parent.children.append(child)
+    token = current_span.set(child)
+    try:
+        yield
+    finally:
+        current_span.reset(token)
+        child.finish()
+
+
+def handler_name(handler):
+    """Nama yang mudah dibaca untuk handler dispatcher"""
+    commands = getattr(handler, 'command', None)
+    if commands:
+        return '/' + commands[0]
+    return getattr(handler.callback, '__name__', type(handler).__name__)
+
+
+def profiled(callback, name):
+    """Bungkus callback handler agar setiap pemanggilannya direkam saat profiling aktif"""
+
+    @functools.wraps(callback)
+    def wrapper(update, context):
+        if not settings['enabled']:
+            return callback(update, context)
+
+        root = Span(name)
+        token = current_span.set(root)
+        profiler = cProfile.Profile() if settings['cprofile'] else None
+        if profiler:
+            profiler.enable()
+        try:
+            return callback(update, context)
+        finally:
+            if profiler:
+                profiler.disable()
+            current_span.reset(token)
+            root.finish()
+            if root.duration_ms >= settings['threshold_ms']:
+                user = getattr(update, 'effective_user', None)
+                dump_trace(root, user.id if user else None, profiler)
+
+    return wrapper
+
+
+def instrument_dispatcher(dispatcher):
+    """Bungkus semua handler di group 0, termasuk handler di dalam ConversationHandler"""
+
+    def instrument(handler):
+        if isinstance(handler, ConversationHandler):
+            for nested in handler.entry_points + handler.fallbacks:
+                instrument(nested)
+            for handlers in handler.states.values():
+                for nested in handlers:
+                    instrument(nested)
+        else:
+            handler.callback = profiled(handler.callback, handler_name(handler))
+
+    for handler in dispatcher.handlers.get(0, []):
+        instrument(handler)
+
+
+def dump_trace(root, user_id, profiler=None, directory=TRACES_DIR):
+    """Simpan span tree (dan statistik cProfile) command yang lambat, lalu rotasi folder"""
+    os.makedirs(directory, exist_ok=True)
+    # Nanodetik agar command yang selesai pada detik yang sama tidak saling menimpa
+    stamp = f"{time.strftime('%Y%m%d-%H%M%S')}.{time.time_ns() % 10 ** 9:09d}"
+    base = os.path.join(directory, f"{stamp}-{int(root.duration_ms)}-{root.name.strip('/')}")
+
+    trace = {
+        'command': root.name,
+        'user_id': user_id,
+        'time': time.time(),
+        'duration_ms': root.duration_ms,
+        'spans': root.as_dict()['children'],
+    }
+    if profiler:
+        profiler.dump_stats(base + '.prof')
+        output = io.StringIO()
+        pstats.Stats(profiler, stream=output).sort_stats('cumulative').print_stats(PSTATS_LIMIT)
+        trace['profile'] = output.getvalue()
+
+    try:
+        with open(base + '.json', 'w') as f:
+            json.dump(trace, f, indent=2)
+        logger.warning("Command lambat %s (%.0f ms), trace disimpan: %s", root.name, root.duration_ms, base)
+    except OSError as e:
+        logger.error("Gagal menyimpan trace %s: %s", base, e)
+
+    rotate_traces(directory)
+
+
+def rotate_traces(directory=TRACES_DIR, keep=MAX_TRACES):
+    """Hapus trace tertua agar folder tidak membesar"""
+    traces = sorted(glob.glob(os.path.join(directory, '*.json')))
+    for path in traces[:-keep]:
+        for old in (path, path[:-len('.json')] + '.prof'):
+            try:
+                os.remove(old)
+            except OSError:
+                pass
+
+
+def slowest_traces(limit=20, directory=TRACES_DIR):
+    """Ringkasan trace tersimpan, diurutkan dari yang paling lambat (untuk web interface)"""
+    traces = []
+    for path in glob.glob(os.path.join(directory, '*.json')):
+        try:
+            with open(path, 'r') as f:
+                trace = json.load(f)
+        except (OSError, ValueError):
+            continue
+        trace['file'] = os.path.basename(path)
+        trace['phases'] = ', '.join(f"{s['name']} {s['duration_ms']:.0f}ms" for s in trace.get('spans', []))
+        traces.append(trace)
+    traces.sort(key=lambda trace: trace.get('duration_ms', 0), reverse=True)
+    return traces[:limit]
+
+
+def traced_login(api, username, password):
+    """Login method librouteros dengan span 'login'"""
+    with span('login'):
+        return plain(api=api, username=username, password=password)
+
+
+class TracedApi(Api):
+    """Api librouteros yang mencatat setiap command ke router sebagai span"""
+
+    def __call__(self, cmd, **kwargs):
+        with span(f'router {cmd}'):
+            response = list(super().__call__(cmd, **kwargs))
+        yield from response
+
+    def rawCmd(self, cmd, *words):
+        with span(f'router {cmd}'):
+            response = list(super().rawCmd(cmd, *words))
+        yield from response
+
+
+class TracedRequest(Request):
+    """Request Bot API yang mencatat setiap panggilan ke Telegram sebagai span"""
+
+    def post(self, url, data, timeout=None):
+        with span(f"telegram {url.rsplit('/', 1)[-1]}"):
+            return super().post(url, data, timeout=timeout)
@@ -3,20 +3,33 @@ import json
 import logging
 import telegram
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
-from telegram.ext import Updater, CommandHandler, CallbackQueryHandler, MessageHandler, Filters, CallbackContext, ConversationHandler
+from telegram.ext import Updater, CommandHandler, CallbackQueryHandler, MessageHandler, Filters, CallbackContext, ConversationHandler, TypeHandler
 import random
 import string
 from dotenv import load_dotenv
 import librouteros
 import ssl
 import socket
+import re
+import time
+import voucher_sheet
+import voucher_io
+import voucher_ledger
+import config_store
+import tempfile
+import profiling
+from profiling import span
+from logging_setup import setup_logging, register_secret, new_request_id, clear_request_id, request_duration_ms, log_duration
+from hotspot_watcher import HotspotWatcher, find_limit_reached, format_events
+from voucher_pool import VoucherPool
+from health_sampler import HealthSampler, trend, sparkline, sparkline_image
+from circuit_breaker import CircuitBreaker, OPEN
+from hotspot_rows import HotspotUser, USER_FIELDS, ACTIVE_FIELDS, is_true
+from librouteros.query import Key
+from collections import deque
 
 # Set up logging
-logging.basicConfig(
-    filename='telegram_bot.log',
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
+setup_logging('telegram_bot.log')
 logger = logging.getLogger(__name__)
 
 # Load environment variables jika ada
@@ -33,41 +46,85 @@ COMMENT = 5
 # States untuk detail handler
 DETAIL_USERNAME = 0
 
+# Pengaturan voucher cepat (/v dan template)
+TEMPLATES_FILE = 'voucher_templates.json'
+PROFILE_CACHE_TTL = 300
+MAX_BATCH_COUNT = 50
+LIMIT_PATTERN = re.compile(r'^(\d+[wdhms])+$')
+TEMPLATE_NAME_PATTERN = re.compile(r'^\w{1,32}$')
+
+# Interval pengiriman notifikasi aktivitas hotspot (detik)
+NOTIFY_INTERVAL = 30
+
+# Watcher event hotspot, aktif jika notifikasi diaktifkan di main()
+hotspot_watcher = None
+
+# Sampler kesehatan router untuk /status, dijalankan di main()
+health_sampler = None
+
+# Stok voucher siap pakai, aktif jika VOUCHER_POOL diatur di config
+voucher_pool = None
+
+# Cache daftar profile hotspot agar validasi /v tidak perlu login ke Mikrotik
+_profile_cache = {'profiles': [], 'expires': 0}
+
 # Load config dari file
 def load_config():
     try:
-        with open('config.json', 'r') as f:
-            config = json.load(f)
-            logger.info("Konfigurasi berhasil dimuat dari config.json")
-            return config
+        # Snapshot di memori; file hanya dibaca (dan didekripsi) ulang jika berubah
+        config = config_store.load()
+        register_secret(config.get('PASSWORD_MIKROTIK'))
+        register_secret(config.get('TELEGRAM_TOKEN'))
+        logger.debug("Konfigurasi berhasil dimuat dari config.json")
+        return config
+    except config_store.ConfigError as e:
+        logger.error("Config tidak dapat didekripsi: %s", e)
+        return None
     except (FileNotFoundError, json.JSONDecodeError) as e:
-        logger.error(f"Config file tidak ditemukan atau tidak valid: {e}")
+        logger.error("Config file tidak ditemukan atau tidak valid: %s", e)
         return None
 
 def connect_to_mikrotik(config):
-    """Fungsi untuk terhubung ke API Mikrotik"""
+    """Fungsi untuk terhubung ke API Mikrotik melalui circuit breaker"""
+    if not router_breaker.allow():
+        logger.debug("Koneksi ke Mikrotik ditolak: circuit breaker terbuka")
+        return None
+    
+    api, error = open_mikrotik_connection(config)
+    if api:
+        router_breaker.record_success()
+    elif error:
+        router_breaker.record_failure(error)
+    return api
+
+def open_mikrotik_connection(config):
+    """Membuka koneksi ke API Mikrotik, mengembalikan (api, pesan error)"""
     try:
         # Validasi konfigurasi
         if not config or not config.get('IP_MIKROTIK') or not config.get('USERNAME_MIKROTIK'):
             logger.error("Konfigurasi Mikrotik tidak lengkap")
-            return None
+            return None, None
             
         # Cek koneksi dasar ke host/port
-        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        sock.settimeout(5)
-        result = sock.connect_ex((config['IP_MIKROTIK'], int(config['PORT_API_MIKROTIK'])))
-        sock.close()
+        with span('tcp_probe'):
+            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            sock.settimeout(5)
+            result = sock.connect_ex((config['IP_MIKROTIK'], int(config['PORT_API_MIKROTIK'])))
+            sock.close()
         
         if result != 0:
-            logger.error(f"Port {config['PORT_API_MIKROTIK']} pada {config['IP_MIKROTIK']} tertutup atau tidak dapat dijangkau")
-            return None
+            logger.error("Port %s pada %s tertutup atau tidak dapat dijangkau", config['PORT_API_MIKROTIK'], config['IP_MIKROTIK'])
+            return None, f"Port {config['PORT_API_MIKROTIK']} tertutup atau tidak dapat dijangkau"
             
         # Persiapkan argumen koneksi
         kwargs = {
             'host': config['IP_MIKROTIK'],
             'port': int(config['PORT_API_MIKROTIK']),
             'username': config['USERNAME_MIKROTIK'],
-            'password': config['PASSWORD_MIKROTIK']
+            'password': config['PASSWORD_MIKROTIK'],
+            # Catat login dan setiap command ke router sebagai span saat profiling aktif
+            'subclass': profiling.TracedApi,
+            'login_method': profiling.traced_login,
         }
         
         # Konfigurasi SSL jika digunakan
@@ -85,37 +142,57 @@ def connect_to_mikrotik(config):
             
             # Buat fungsi wrapper khusus yang menyediakan server_hostname
             def ssl_wrapper(sock):
-                return ctx.wrap_socket(sock, server_hostname=config['IP_MIKROTIK'])
+                with span('tls'):
+                    return ctx.wrap_socket(sock, server_hostname=config['IP_MIKROTIK'])
             
             # Tambahkan wrapper ke argumen
             kwargs['ssl_wrapper'] = ssl_wrapper
         
         # Koneksi ke Mikrotik dengan argumen yang telah disiapkan
-        api = librouteros.connect(**kwargs)
+        with span('connect'):
+            api = librouteros.connect(**kwargs)
         
-        logger.info(f"Berhasil terhubung ke Mikrotik API {config['IP_MIKROTIK']}:{config['PORT_API_MIKROTIK']}")
-        return api
+        logger.info("Berhasil terhubung ke Mikrotik API %s:%s", config['IP_MIKROTIK'], config['PORT_API_MIKROTIK'])
+        return api, None
     except socket.gaierror:
-        logger.error(f"Nama host tidak dapat diselesaikan: {config['IP_MIKROTIK']}")
-        return None
+        logger.error("Nama host tidak dapat diselesaikan: %s", config['IP_MIKROTIK'])
+        return None, "Nama host tidak dapat diselesaikan"
     except socket.timeout:
-        logger.error(f"Koneksi timeout ke {config['IP_MIKROTIK']}:{config['PORT_API_MIKROTIK']}")
-        return None
-    except librouteros.exceptions.AuthenticationError:
+        logger.error("Koneksi timeout ke %s:%s", config['IP_MIKROTIK'], config['PORT_API_MIKROTIK'])
+        return None, "Koneksi timeout"
+    except librouteros.exceptions.TrapError:
+        # Login ditolak (librouteros 3 melempar TrapError): router masih merespons,
+        # jadi tidak dihitung sebagai kegagalan circuit breaker
         logger.error("Login gagal: username/password salah")
-        return None
+        return None, None
     except librouteros.exceptions.ConnectionClosed as e:
-        logger.error(f"Error koneksi ke Mikrotik: {e}. Pastikan API service aktif.")
-        return None
+        logger.error("Error koneksi ke Mikrotik: %s. Pastikan API service aktif.", e)
+        return None, f"Koneksi ditutup: {e}"
     except ValueError as e:
-        logger.error(f"Error SSL konfigurasi: {e}")
-        return None
+        logger.error("Error SSL konfigurasi: %s", e)
+        return None, f"Error SSL konfigurasi: {e}"
     except TypeError as e:
-        logger.error(f"Error SSL wrapper: {e}")
-        return None
+        logger.error("Error SSL wrapper: %s", e)
+        return None, f"Error SSL wrapper: {e}"
     except Exception as e:
-        logger.error(f"Error connecting to Mikrotik: {e}")
-        return None
+        logger.error("Error connecting to Mikrotik: %s", e)
+        return None, str(e)
+
+def probe_router():
+    """Probe koneksi untuk circuit breaker, tanpa melewati breaker itu sendiri"""
+    api, error = open_mikrotik_connection(load_config())
+    if api:
+        api.close()
+        return True, None
+    return False, error
+
+router_breaker = CircuitBreaker(probe=probe_router)
+
+def connection_failed_message():
+    """Pesan untuk user saat koneksi ke Mikrotik gagal"""
+    if not router_breaker.allow():
+        return f'❌ {router_breaker.down_message()}. Notifikasi akan dikirim saat router kembali online.'
+    return '❌ Gagal terhubung ke Mikrotik. Periksa konfigurasi dan pastikan API aktif.'
 
 def get_hotspot_profiles(api):
     """Mendapatkan daftar profile hotspot dari Mikrotik"""
@@ -124,14 +201,32 @@ def get_hotspot_profiles(api):
             logger.error("Tidak dapat mengambil profile hotspot: API tidak terhubung")
             return []
             
-        profiles = api.path('ip/hotspot/user/profile')
+        profiles = api.path('ip/hotspot/user/profile').select('name')
         profiles_list = [profile.get('name') for profile in profiles]
-        logger.info(f"Berhasil mendapatkan {len(profiles_list)} profile hotspot")
+        logger.info("Berhasil mendapatkan %s profile hotspot", len(profiles_list))
         return profiles_list
     except Exception as e:
-        logger.error(f"Error getting hotspot profiles: {e}")
+        logger.error("Error getting hotspot profiles: %s", e)
         return []
 
+def get_cached_profiles(config):
+    """Mendapatkan daftar profile hotspot dari cache, refresh jika sudah kadaluarsa"""
+    if _profile_cache['profiles'] and _profile_cache['expires'] > time.time():
+        return _profile_cache['profiles']
+    
+    api = connect_to_mikrotik(config)
+    if not api:
+        # Gunakan cache lama jika Mikrotik tidak dapat dihubungi
+        return _profile_cache['profiles']
+    
+    profiles = get_hotspot_profiles(api)
+    api.close()
+    
+    if profiles:
+        _profile_cache['profiles'] = profiles
+        _profile_cache['expires'] = time.time() + PROFILE_CACHE_TTL
+    return profiles
+
 def generate_random_string(length):
     """Generate random string untuk username/password"""
     chars = string.ascii_letters + string.digits
@@ -140,19 +235,23 @@ def generate_random_string(length):
 def start(update: Update, context: CallbackContext) -> None:
     """Handler untuk command /start"""
     user = update.effective_user
-    logger.info(f"User {user.id} ({user.first_name}) memulai bot")
+    logger.info("User %s (%s) memulai bot", user.id, user.first_name)
     update.message.reply_text(
         f'Selamat datang {user.first_name} di Bot Mikrotik Hotspot Voucher Generator!\n'
         'Gunakan /voucher untuk membuat voucher hotspot baru.\n'
+        'Gunakan /v <profile> <limit> [jumlah] [komentar] untuk membuat voucher cepat.\n'
+        'Gunakan /template untuk membuat voucher dari template tersimpan.\n'
         'Gunakan /list untuk melihat daftar voucher yang ada.\n'
         'Gunakan /status untuk melihat status koneksi ke Mikrotik.\n'
-        'Gunakan /detail untuk melihat detail penggunaan voucher.'
+        'Gunakan /detail untuk melihat detail penggunaan voucher.\n'
+        'Gunakan /export [csv|ndjson] untuk mengunduh seluruh user hotspot.\n'
+        'Gunakan /report [hari|minggu|bulan] untuk melihat laporan penjualan voucher.'
     )
 
 def cancel(update: Update, context: CallbackContext) -> int:
     """Handler untuk membatalkan operasi"""
     user = update.effective_user
-    logger.info(f"User {user.id} membatalkan operasi")
+    logger.info("User %s membatalkan operasi", user.id)
     update.message.reply_text('Operasi dibatalkan.')
     return ConversationHandler.END
 
@@ -164,18 +263,33 @@ def status(update: Update, context: CallbackContext) -> None:
         return
     
     user = update.effective_user
-    logger.info(f"User {user.id} memeriksa status koneksi")
+    logger.info("User %s memeriksa status koneksi", user.id)
+    
+    # Circuit breaker lebih dulu: sampel lama tidak boleh melaporkan router yang sedang down
+    if not router_breaker.allow():
+        update.message.reply_text(connection_failed_message())
+        return
+    
+    # Jawab langsung dari sampel di memori jika sampler sudah berjalan
+    if health_sampler:
+        samples, info = health_sampler.snapshot()
+        if samples and time.time() - samples[-1].time < health_sampler.interval * 3:
+            update.message.reply_text(format_health_status(config, samples, info))
+            image = sparkline_image(samples)
+            if image:
+                update.message.reply_photo(photo=image, caption='📈 CPU (biru) dan user aktif (hijau)')
+            return
     
     update.message.reply_text('🔄 Memeriksa koneksi ke Mikrotik...')
     
     try:
         api = connect_to_mikrotik(config)
         if not api:
-            update.message.reply_text('❌ Gagal terhubung ke Mikrotik. Periksa konfigurasi dan pastikan API aktif.')
+            update.message.reply_text(connection_failed_message())
             return
             
         # Ambil informasi sistem
-        system_info = list(api.path('/system/resource'))
+        system_info = list(api.path('/system/resource').select('uptime', 'version', 'cpu-load', 'free-memory'))
         if system_info:
             info = system_info[0]
             uptime = info.get('uptime', 'unknown')
@@ -197,9 +311,37 @@ def status(update: Update, context: CallbackContext) -> None:
             
         api.close()
     except Exception as e:
-        logger.error(f"Error memeriksa status: {e}")
+        logger.error("Error memeriksa status: %s", e)
         update.message.reply_text(f'❌ Error saat memeriksa status Mikrotik: {str(e)}')
 
+def format_health_status(config, samples, info):
+    """Format pesan /status dari sampel kesehatan router"""
+    latest = samples[-1]
+    cpu_min, cpu_avg, cpu_max = trend(samples, 'cpu_load')
+    mem_min, _, mem_max = trend(samples, 'free_memory')
+    users_min, users_avg, users_max = trend(samples, 'active_users')
+    _, rx_avg, rx_max = trend(samples, 'rx_bps')
+    _, tx_avg, tx_max = trend(samples, 'tx_bps')
+    minutes = (latest.time - samples[0].time) / 60
+    age = max(time.time() - latest.time, 0)
+    
+    return (
+        f"✅ Terhubung ke Mikrotik\n\n"
+        f"🖥️ IP: {config['IP_MIKROTIK']}\n"
+        f"🔄 Versi: {info.get('version', 'unknown')}\n"
+        f"⏱️ Uptime: {info.get('uptime', 'unknown')}\n\n"
+        f"📊 CPU: {latest.cpu_load}% (min {cpu_min}%, rata-rata {cpu_avg:.0f}%, max {cpu_max}%)\n"
+        f"{sparkline(sample.cpu_load for sample in samples)}\n"
+        f"🧠 Free Memory: {latest.free_memory/1024/1024:.2f} MB "
+        f"(min {mem_min/1024/1024:.2f}, max {mem_max/1024/1024:.2f})\n"
+        f"📥 Download: {latest.rx_bps/1e6:.2f} Mbps (rata-rata {rx_avg/1e6:.2f}, max {rx_max/1e6:.2f})\n"
+        f"📤 Upload: {latest.tx_bps/1e6:.2f} Mbps (rata-rata {tx_avg/1e6:.2f}, max {tx_max/1e6:.2f})\n"
+        f"👥 User Aktif: {latest.active_users} (min {users_min}, rata-rata {users_avg:.0f}, max {users_max})\n"
+        f"{sparkline(sample.active_users for sample in samples)}\n\n"
+        f"🕐 Tren {minutes:.0f} menit terakhir, {len(samples)} sampel, "
+        f"sampel terakhir {age:.0f} detik lalu"
+    )
+
 def detail_start(update: Update, context: CallbackContext) -> int:
     """Handler untuk command /detail"""
     config = load_config()
@@ -208,12 +350,12 @@ def detail_start(update: Update, context: CallbackContext) -> int:
         return ConversationHandler.END
     
     user = update.effective_user
-    logger.info(f"User {user.id} memulai melihat detail voucher")
+    logger.info("User %s memulai melihat detail voucher", user.id)
     
     # Cek koneksi ke Mikrotik terlebih dahulu
     api = connect_to_mikrotik(config)
     if not api:
-        update.message.reply_text('❌ Gagal terhubung ke Mikrotik. Periksa konfigurasi dan pastikan API aktif.')
+        update.message.reply_text(connection_failed_message())
         return ConversationHandler.END
     
     # Tutup koneksi setelah cek
@@ -229,7 +371,7 @@ def detail_get_username(update: Update, context: CallbackContext) -> int:
     """Handler untuk menerima username voucher yang akan dilihat detailnya"""
     username = update.message.text.strip()
     user = update.effective_user
-    logger.info(f"User {user.id} melihat detail voucher untuk username: {username}")
+    logger.info("User %s melihat detail voucher untuk username: %s", user.id, username)
     
     config = load_config()
     if not config:
@@ -242,36 +384,26 @@ def detail_get_username(update: Update, context: CallbackContext) -> int:
         # Coba terhubung ke Mikrotik
         api = connect_to_mikrotik(config)
         if not api:
-            update.message.reply_text('❌ Gagal terhubung ke Mikrotik.')
+            update.message.reply_text(connection_failed_message())
             return ConversationHandler.END
         
         # Cari user hotspot berdasarkan username
         try:
-            users = api.path('ip/hotspot/user').select('name', 'profile', 'limit-uptime', 'uptime', 'disabled', 'comment', '.id')
-            user_found = False
-            user_data = None
+            # Filter dilakukan di router, bukan dengan memindai seluruh tabel user
+            users = api.path('ip/hotspot/user').select(*USER_FIELDS).where(Key('name') == username)
+            user_data = next(iter(users), None)
             
-            for u in users:
-                if u.get('name') == username:
-                    user_found = True
-                    user_data = u
-                    break
-            
-            if not user_found:
+            if not user_data:
                 api.close()
                 update.message.reply_text(f'❌ Username "{username}" tidak ditemukan di daftar user hotspot.')
                 return ConversationHandler.END
             
             # Ambil data tambahan dari active users jika ada
             active_data = None
-            try:
-                active_users = api.path('ip/hotspot/active').select('user', 'uptime', 'session-time-left', 'address', 'bytes-in', 'bytes-out')
-                for active in active_users:
-                    if active.get('user') == username:
-                        active_data = active
-                        break
-            except Exception as e:
-                logger.error(f"Error mengambil data active users: {e}")
+            if hotspot_watcher and hotspot_watcher.synced:
+                active_data = hotspot_watcher.get_active(username)
+            else:
+                active_data = find_active_session(api, username)
             
             # Format pesan
             message = f"📋 Detail Voucher: {username}\n\n"
@@ -279,7 +411,7 @@ def detail_get_username(update: Update, context: CallbackContext) -> int:
             message += f"🔑 Profile: {user_data.get('profile', 'N/A')}\n"
             
             # Status aktif/nonaktif
-            is_disabled = user_data.get('disabled', 'false') == 'true'
+            is_disabled = is_true(user_data.get('disabled'))
             message += f"🔴 Status: {'Dinonaktifkan' if is_disabled else 'Aktif'}\n"
             
             # Limit waktu dan penggunaan waktu
@@ -320,15 +452,24 @@ def detail_get_username(update: Update, context: CallbackContext) -> int:
             
         except Exception as e:
             api.close()
-            logger.error(f"Error mencari user: {e}")
+            logger.error("Error mencari user: %s", e)
             update.message.reply_text(f'❌ Error saat mencari user: {str(e)}')
     
     except Exception as e:
-        logger.error(f"Error saat melihat detail voucher: {e}")
+        logger.error("Error saat melihat detail voucher: %s", e)
         update.message.reply_text(f'❌ Error: {str(e)}')
     
     return ConversationHandler.END
 
+def find_active_session(api, username):
+    """Mencari sesi aktif username langsung dari Mikrotik"""
+    try:
+        active_users = api.path('ip/hotspot/active').select(*ACTIVE_FIELDS).where(Key('user') == username)
+        return next(iter(active_users), None)
+    except Exception as e:
+        logger.error("Error mengambil data active users: %s", e)
+    return None
+
 def format_bytes(size):
     """Format bytes menjadi ukuran yang readable"""
     power = 2**10
@@ -347,19 +488,22 @@ def voucher(update: Update, context: CallbackContext) -> int:
         return ConversationHandler.END
     
     user = update.effective_user
-    logger.info(f"User {user.id} memulai pembuatan voucher")
+    logger.info("User %s memulai pembuatan voucher", user.id)
     
     update.message.reply_text('🔄 Menghubungkan ke Mikrotik...')
     
     api = connect_to_mikrotik(config)
     if not api:
-        update.message.reply_text('❌ Gagal terhubung ke Mikrotik. Periksa konfigurasi dan pastikan API aktif.')
+        update.message.reply_text(connection_failed_message())
         return ConversationHandler.END
     
     profiles = get_hotspot_profiles(api)
     api.close()
     
-    if not profiles:
+    if profiles:
+        _profile_cache['profiles'] = profiles
+        _profile_cache['expires'] = time.time() + PROFILE_CACHE_TTL
+    else:
         update.message.reply_text('❌ Tidak ada profile hotspot yang ditemukan. Pastikan konfigurasi hotspot sudah dibuat di Mikrotik.')
         return ConversationHandler.END
     
@@ -376,17 +520,43 @@ def profile_callback(update: Update, context: CallbackContext) -> int:
     
     profile = query.data.replace('profile_', '')
     context.user_data['profile'] = profile
-    logger.info(f"User memilih profile: {profile}")
+    logger.info("User memilih profile: %s", profile)
     
     keyboard = [
         [InlineKeyboardButton("Random", callback_data='username_random')],
         [InlineKeyboardButton("Custom", callback_data='username_custom')]
     ]
+    
+    stock = pool_stock(profile)
+    if stock:
+        keyboard.insert(0, [InlineKeyboardButton(f"⚡ Ambil dari stok ({stock})", callback_data='pool_take')])
     reply_markup = InlineKeyboardMarkup(keyboard)
     
     query.edit_message_text(text=f"Profile: {profile}\nPilih tipe username:", reply_markup=reply_markup)
     return USERNAME_TYPE
 
+def pool_take_callback(update: Update, context: CallbackContext) -> int:
+    """Handler untuk callback ambil voucher dari stok, tanpa menunggu Mikrotik"""
+    query = update.callback_query
+    query.answer()
+    
+    profile = context.user_data['profile']
+    taken = take_from_pool({'profile': profile, 'limit': pool_limit(profile), 'count': 1, 'comment': None},
+                           update.effective_user, source='voucher:pool')
+    if not taken:
+        query.edit_message_text(text="❌ Stok voucher habis. Silakan /voucher lagi dan pilih Random atau Custom.")
+        return ConversationHandler.END
+    
+    v = taken[0]
+    query.edit_message_text(
+        text=f"✅ Voucher dari stok!\n\n"
+             f"Profile: {v['profile']}\n"
+             f"Username: {v['username']}\n"
+             f"Password: {v['password']}\n"
+             f"Limit: {v['limit'] if v['limit'] else 'Tidak ada'}"
+    )
+    return ConversationHandler.END
+
 def username_type_callback(update: Update, context: CallbackContext) -> int:
     """Handler untuk callback tipe username"""
     query = update.callback_query
@@ -394,13 +564,13 @@ def username_type_callback(update: Update, context: CallbackContext) -> int:
     
     username_type = query.data.replace('username_', '')
     context.user_data['username_type'] = username_type
-    logger.info(f"User memilih tipe username: {username_type}")
+    logger.info("User memilih tipe username: %s", username_type)
     
     if username_type == 'random':
         # Generate random username
         username = generate_random_string(8)
         context.user_data['username'] = username
-        logger.info(f"Generated random username: {username}")
+        logger.info("Generated random username: %s", username)
         
         # Langsung ke pilihan password
         keyboard = [
@@ -423,7 +593,7 @@ def username_input(update: Update, context: CallbackContext) -> int:
     """Handler untuk input username custom"""
     username = update.message.text
     context.user_data['username'] = username
-    logger.info(f"User memasukkan username custom: {username}")
+    logger.info("User memasukkan username custom: %s", username)
     
     keyboard = [
         [InlineKeyboardButton("Random", callback_data='password_random')],
@@ -444,13 +614,13 @@ def password_callback(update: Update, context: CallbackContext) -> int:
     query.answer()
     
     password_type = query.data.replace('password_', '')
-    logger.info(f"User memilih tipe password: {password_type}")
+    logger.info("User memilih tipe password: %s", password_type)
     
     if password_type == 'random':
         # Generate random password
         password = generate_random_string(8)
         context.user_data['password'] = password
-        logger.info(f"Generated random password: {password}")
+        logger.info("Password random dibuat")
         
         # Tanyakan limit
         query.edit_message_text(
@@ -464,7 +634,7 @@ def password_callback(update: Update, context: CallbackContext) -> int:
         # Gunakan username sebagai password
         password = context.user_data['username']
         context.user_data['password'] = password
-        logger.info(f"Menggunakan username sebagai password: {password}")
+        logger.info("Menggunakan username sebagai password")
         
         # Tanyakan limit
         query.edit_message_text(
@@ -483,7 +653,7 @@ def password_input(update: Update, context: CallbackContext) -> int:
     """Handler untuk input password custom"""
     password = update.message.text
     context.user_data['password'] = password
-    logger.info(f"User memasukkan password custom")
+    logger.info("User memasukkan password custom")
     
     update.message.reply_text(
         f"Profile: {context.user_data['profile']}\n"
@@ -496,7 +666,7 @@ def password_input(update: Update, context: CallbackContext) -> int:
 def limit_input(update: Update, context: CallbackContext) -> int:
     """Handler untuk input limit waktu"""
     limit = update.message.text.strip().lower()
-    logger.info(f"User memasukkan limit waktu: {limit}")
+    logger.info("User memasukkan limit waktu: %s", limit)
     
     if limit == 'none':
         context.user_data['limit'] = None
@@ -515,7 +685,7 @@ def limit_input(update: Update, context: CallbackContext) -> int:
 def comment_input(update: Update, context: CallbackContext) -> int:
     """Handler untuk input komentar"""
     comment = update.message.text.strip()
-    logger.info(f"User memasukkan komentar: {comment}")
+    logger.info("User memasukkan komentar: %s", comment)
     
     if comment.lower() == 'none':
         context.user_data['comment'] = None
@@ -525,7 +695,7 @@ def comment_input(update: Update, context: CallbackContext) -> int:
     update.message.reply_text("🔄 Membuat voucher...")
     
     # Buat voucher
-    result = create_voucher(context.user_data)
+    result = create_voucher(context.user_data, update.effective_user)
     
     if result[0]:
         # Berhasil
@@ -543,43 +713,327 @@ def comment_input(update: Update, context: CallbackContext) -> int:
     
     return ConversationHandler.END
 
-def create_voucher(user_data):
+def create_voucher(user_data, operator=None):
     """Fungsi untuk membuat voucher di Mikrotik Hotspot"""
+    success, message, _ = create_vouchers([user_data], operator, source='voucher')
+    return success, message
+
+def create_vouchers(vouchers, operator=None, source=None):
+    """Membuat beberapa voucher sekaligus dengan satu koneksi ke Mikrotik.
+    
+    Voucher yang berhasil dibuat dicatat ke ledger atas nama operator (user Telegram).
+    """
     config = load_config()
     if not config:
-        return False, "Konfigurasi tidak ditemukan"
-    
-    logger.info(f"Membuat voucher untuk username: {user_data['username']}")
+        return False, "Konfigurasi tidak ditemukan", []
     
+    created = []
     try:
         api = connect_to_mikrotik(config)
         if not api:
-            return False, "Tidak dapat terhubung ke Mikrotik. Periksa konfigurasi dan pastikan API aktif."
+            if not router_breaker.allow():
+                return False, router_breaker.down_message(), []
+            return False, "Tidak dapat terhubung ke Mikrotik. Periksa konfigurasi dan pastikan API aktif.", []
         
-        params = {
+        rows = [{
             'name': user_data['username'],
             'password': user_data['password'],
             'profile': user_data['profile'],
-        }
-        
-        if user_data.get('limit'):
-            params['limit-uptime'] = user_data['limit']
+            'limit-uptime': user_data.get('limit'),
+            'comment': user_data.get('comment'),
+        } for user_data in vouchers]
         
-        if user_data.get('comment'):
-            params['comment'] = user_data['comment']
+        try:
+            # Semua perintah add dikirim sekaligus (tagged), balasannya dibaca setelahnya
+            with log_duration(logger, "Membuat %s voucher dalam satu koneksi", len(vouchers)):
+                errors = dict(voucher_io.add_batch(api, 'ip/hotspot/user', rows))
+        except Exception as e:
+            # Perintah add mungkin sudah dijalankan router walaupun balasannya hilang;
+            # periksa ulang agar ledger dan balasan sesuai dengan isi router
+            logger.error("Balasan add voucher tidak lengkap: %s", e)
+            existing = recheck_created(config, rows)
+            if existing is None:
+                raise
+            errors = {index: str(e) for index in range(len(rows)) if index not in existing}
+        finally:
+            api.close()
         
-        # Tambahkan user hotspot baru
-        api.path('ip/hotspot/user').add(**params)
+        created = [user_data for index, user_data in enumerate(vouchers) if index not in errors]
+        record_vouchers(config, created, operator, source)
         
-        api.close()
-        logger.info(f"Voucher berhasil dibuat untuk username: {user_data['username']}")
-        return True, "Voucher berhasil dibuat"
+        logger.info("Berhasil membuat %s voucher, %s gagal", len(created), len(errors))
+        if errors:
+            first_error = next(iter(errors.values()))
+            return False, f"{len(errors)} voucher gagal dibuat: {first_error}", created
+        return True, "Voucher berhasil dibuat", created
     except librouteros.exceptions.ConnectionClosed as e:
-        logger.error(f"Error koneksi saat membuat voucher: {e}")
-        return False, f"Error koneksi: {str(e)}"
+        logger.error("Error koneksi saat membuat voucher: %s", e)
+        return False, f"Error koneksi: {str(e)}", created
     except Exception as e:
-        logger.error(f"Error creating voucher: {e}")
-        return False, str(e)
+        logger.error("Error creating vouchers: %s", e)
+        return False, str(e), created
+
+def recheck_created(config, rows):
+    """Index voucher yang ternyata sudah ada di router, atau None jika tidak dapat diperiksa"""
+    api = connect_to_mikrotik(config)
+    if not api:
+        logger.error("Status %s voucher tidak dapat diperiksa ulang: router tidak terhubung", len(rows))
+        return None
+    try:
+        return voucher_io.find_existing(api, 'ip/hotspot/user', rows)
+    except Exception as e:
+        logger.error("Status %s voucher tidak dapat diperiksa ulang: %s", len(rows), e)
+        return None
+    finally:
+        api.close()
+
+def record_vouchers(config, vouchers, operator=None, source=None):
+    """Catat voucher ke ledger penjualan; kegagalan ledger tidak membatalkan voucher"""
+    try:
+        voucher_ledger.record(
+            vouchers,
+            operator_id=operator.id if operator else None,
+            operator_name=operator.full_name if operator else None,
+            source=source,
+            prices=config.get('VOUCHER_PRICES'),
+        )
+    except Exception as e:
+        logger.error("Gagal mencatat %s voucher ke ledger: %s", len(vouchers), e)
+
+def load_templates():
+    """Memuat template voucher yang tersimpan"""
+    try:
+        with open(TEMPLATES_FILE, 'r') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+def save_templates(templates):
+    """Menyimpan template voucher ke file"""
+    with open(TEMPLATES_FILE, 'w') as f:
+        json.dump(templates, f, indent=2)
+
+def parse_voucher_spec(args, profiles):
+    """Parse dan validasi argumen <profile> <limit> [jumlah] [komentar] secara lokal.
+    
+    Mengembalikan tuple (spec, error). Salah satunya selalu None.
+    """
+    if len(args) < 2:
+        return None, 'Format: /v <profile> <limit> [jumlah] [komentar]'
+    
+    profile, limit = args[0], args[1].lower()
+    rest = list(args[2:])
+    
+    if profile not in profiles:
+        return None, f'Profile "{profile}" tidak ditemukan. Profile tersedia: {", ".join(profiles)}'
+    
+    if limit == 'none':
+        limit = None
+    elif not LIMIT_PATTERN.match(limit):
+        return None, f'Limit "{limit}" tidak valid. Contoh: 1h, 1d, 1d12h, none'
+    
+    count = 1
+    if rest and rest[0].isdigit():
+        count = int(rest.pop(0))
+        if count < 1 or count > MAX_BATCH_COUNT:
+            return None, f'Jumlah voucher harus antara 1 dan {MAX_BATCH_COUNT}'
+    
+    comment = ' '.join(rest) or None
+    return {'profile': profile, 'limit': limit, 'count': count, 'comment': comment}, None
+
+def build_vouchers(spec):
+    """Generate username/password random untuk spesifikasi voucher"""
+    vouchers = []
+    for _ in range(spec['count']):
+        username = generate_random_string(8)
+        vouchers.append({
+            'username': username,
+            'password': generate_random_string(8),
+            'profile': spec['profile'],
+            'limit': spec['limit'],
+            'comment': spec['comment'],
+        })
+    return vouchers
+
+def format_created_vouchers(spec, vouchers):
+    """Format pesan hasil pembuatan voucher cepat"""
+    message = (
+        f"✅ {len(vouchers)} voucher berhasil dibuat!\n\n"
+        f"Profile: {spec['profile']}\n"
+        f"Limit: {spec['limit'] if spec['limit'] else 'Tidak ada'}\n"
+        f"Komentar: {spec['comment'] if spec['comment'] else 'Tidak ada'}\n\n"
+    )
+    for v in vouchers:
+        message += f"👤 {v['username']} | 🔑 {v['password']}\n"
+    return message
+
+def pool_limit(profile):
+    """Limit voucher stok untuk profile, sesuai pengaturan VOUCHER_POOL"""
+    return voucher_pool.settings.get(profile, {}).get('limit') if voucher_pool else None
+
+def pool_stock(profile):
+    """Jumlah voucher stok yang siap dibagikan untuk profile"""
+    if not voucher_pool or profile not in voucher_pool.settings:
+        return 0
+    try:
+        return voucher_pool.available(profile, pool_limit(profile))
+    except Exception as e:
+        logger.error("Error membaca stok voucher: %s", e)
+        return 0
+
+def take_from_pool(spec, operator=None, source=None):
+    """Ambil voucher dari stok lokal sesuai spesifikasi dan catat ke ledger"""
+    if not voucher_pool or spec['profile'] not in voucher_pool.settings:
+        return []
+    
+    try:
+        taken = voucher_pool.take(spec['profile'], spec['limit'], spec['count'], spec['comment'])
+    except Exception as e:
+        logger.error("Error mengambil voucher dari stok: %s", e)
+        return []
+    
+    if taken:
+        logger.info("Mengambil %s voucher %s dari stok", len(taken), spec['profile'])
+        record_vouchers(load_config() or {}, taken, operator, source)
+    return taken
+
+def issue_vouchers(spec, operator=None, source=None):
+    """Membuat voucher sesuai spesifikasi, mengembalikan pesan balasan dan voucher yang dibuat.
+    
+    Voucher diambil dari stok lebih dulu; hanya kekurangannya yang dibuat di Mikrotik.
+    """
+    taken = take_from_pool(spec, operator, source=f'{source}:pool' if source else 'pool')
+    if len(taken) == spec['count']:
+        return format_created_vouchers(spec, taken), taken
+    
+    remaining = dict(spec, count=spec['count'] - len(taken))
+    success, error, created = create_vouchers(build_vouchers(remaining), operator, source)
+    created = taken + created
+    if success:
+        return format_created_vouchers(spec, created), created
+    if created:
+        return format_created_vouchers(spec, created) + f"\n⚠️ Sebagian gagal dibuat: {error}", created
+    return f"❌ Gagal membuat voucher: {error}", created
+
+def send_voucher_sheet(message, vouchers):
+    """Kirim lembar cetak HTML (dan kartu PNG jika tersedia) untuk batch voucher"""
+    config = load_config() or {}
+    login_url = config.get('HOTSPOT_LOGIN_URL')
+    
+    try:
+        message.reply_document(
+            document=voucher_sheet.render_html_file(vouchers, login_url),
+            filename=f'voucher-{vouchers[0]["profile"]}.html',
+            caption='🖨️ Lembar cetak voucher'
+        )
+        if voucher_sheet.png_available():
+            for page in voucher_sheet.iter_pages(vouchers):
+                message.reply_document(
+                    document=voucher_sheet.render_png_page(page, login_url),
+                    filename=f'voucher-{vouchers[0]["profile"]}.png'
+                )
+    except Exception as e:
+        logger.error("Error mengirim lembar cetak voucher: %s", e)
+
+def quick_voucher(update: Update, context: CallbackContext) -> None:
+    """Handler untuk command /v, membuat voucher dalam satu pesan"""
+    config = load_config()
+    if not config:
+        update.message.reply_text('❌ Konfigurasi tidak ditemukan. Silakan atur melalui web interface.')
+        return
+    
+    user = update.effective_user
+    logger.info("User %s membuat voucher cepat: %s", user.id, context.args)
+    
+    profiles = get_cached_profiles(config)
+    if not profiles:
+        update.message.reply_text('❌ Tidak dapat mengambil profile hotspot. Periksa koneksi ke Mikrotik.')
+        return
+    
+    spec, error = parse_voucher_spec(context.args, profiles)
+    if error:
+        update.message.reply_text(f'❌ {error}')
+        return
+    
+    message, created = issue_vouchers(spec, update.effective_user, source='v')
+    update.message.reply_text(message)
+    if len(created) > 1:
+        send_voucher_sheet(update.message, created)
+
+def template_command(update: Update, context: CallbackContext) -> None:
+    """Handler untuk command /template: tampilkan, simpan, atau hapus template voucher"""
+    user = update.effective_user
+    args = context.args
+    templates = load_templates()
+    
+    if args and args[0].lower() == 'simpan':
+        if len(args) < 4:
+            update.message.reply_text('Format: /template simpan <nama> <profile> <limit> [jumlah] [komentar]')
+            return
+        
+        name = args[1]
+        if not TEMPLATE_NAME_PATTERN.match(name):
+            update.message.reply_text('❌ Nama template hanya boleh huruf, angka, dan _ (maksimal 32 karakter).')
+            return
+        
+        config = load_config()
+        if not config:
+            update.message.reply_text('❌ Konfigurasi tidak ditemukan. Silakan atur melalui web interface.')
+            return
+        
+        spec, error = parse_voucher_spec(args[2:], get_cached_profiles(config))
+        if error:
+            update.message.reply_text(f'❌ {error}')
+            return
+        
+        templates[name] = spec
+        save_templates(templates)
+        logger.info("User %s menyimpan template voucher: %s", user.id, name)
+        update.message.reply_text(f'✅ Template "{name}" disimpan.')
+        return
+    
+    if args and args[0].lower() == 'hapus':
+        if len(args) < 2 or args[1] not in templates:
+            update.message.reply_text('❌ Template tidak ditemukan. Format: /template hapus <nama>')
+            return
+        
+        del templates[args[1]]
+        save_templates(templates)
+        logger.info("User %s menghapus template voucher: %s", user.id, args[1])
+        update.message.reply_text(f'✅ Template "{args[1]}" dihapus.')
+        return
+    
+    if not templates:
+        update.message.reply_text(
+            'ℹ️ Belum ada template voucher.\n'
+            'Simpan dengan: /template simpan <nama> <profile> <limit> [jumlah] [komentar]'
+        )
+        return
+    
+    keyboard = []
+    for name, spec in templates.items():
+        label = f"{name} ({spec['profile']}, {spec['limit'] or 'tanpa limit'}, x{spec['count']})"
+        keyboard.append([InlineKeyboardButton(label, callback_data=f'tpl_{name}')])
+    
+    update.message.reply_text('Pilih template voucher:', reply_markup=InlineKeyboardMarkup(keyboard))
+
+def template_callback(update: Update, context: CallbackContext) -> None:
+    """Handler untuk callback tombol template voucher"""
+    query = update.callback_query
+    query.answer()
+    
+    name = query.data.replace('tpl_', '', 1)
+    spec = load_templates().get(name)
+    if not spec:
+        query.edit_message_text(text=f'❌ Template "{name}" tidak ditemukan.')
+        return
+    
+    logger.info("User %s membuat voucher dari template: %s", update.effective_user.id, name)
+    query.edit_message_text(text=f"🔄 Membuat voucher dari template {name}...")
+    message, created = issue_vouchers(spec, update.effective_user, source=f'template:{name}')
+    query.message.reply_text(message)
+    if len(created) > 1:
+        send_voucher_sheet(query.message, created)
 
 def list_vouchers(update: Update, context: CallbackContext) -> None:
     """Handler untuk command /list"""
@@ -589,41 +1043,268 @@ def list_vouchers(update: Update, context: CallbackContext) -> None:
         return
     
     user = update.effective_user
-    logger.info(f"User {user.id} meminta daftar voucher")
+    logger.info("User %s meminta daftar voucher", user.id)
     
     update.message.reply_text('🔄 Mengambil daftar voucher...')
     
     api = connect_to_mikrotik(config)
     if not api:
-        update.message.reply_text('❌ Gagal terhubung ke Mikrotik. Periksa konfigurasi dan pastikan API aktif.')
+        update.message.reply_text(connection_failed_message())
         return
     
     try:
-        users = api.path('ip/hotspot/user')
-        user_list = list(users)
+        # Baca baris satu per satu dan simpan hanya 10 user terakhir
+        rows = voucher_io.iter_rows(api, 'ip/hotspot/user', USER_FIELDS)
+        last_users = deque((HotspotUser.from_row(row) for row in rows), maxlen=10)
         api.close()
         
-        if not user_list:
+        if not last_users:
             update.message.reply_text('ℹ️ Tidak ada user hotspot yang ditemukan.')
             return
         
-        # Batasi daftar ke 10 user terakhir
-        last_users = user_list[-10:] if len(user_list) > 10 else user_list
-        
         message = "📋 Daftar 10 User Hotspot Terakhir:\n\n"
         for user in last_users:
-            message += f"👤 Username: {user.get('name', 'N/A')}\n"
-            message += f"🔑 Profile: {user.get('profile', 'N/A')}\n"
-            message += f"⏱️ Limit: {user.get('limit-uptime', 'Tidak ada')}\n"
-            message += f"📝 Komentar: {user.get('comment', 'Tidak ada')}\n"
+            message += f"👤 Username: {user.name or 'N/A'}\n"
+            message += f"🔑 Profile: {user.profile or 'N/A'}\n"
+            message += f"⏱️ Limit: {user.limit_uptime or 'Tidak ada'}\n"
+            message += f"📝 Komentar: {user.comment or 'Tidak ada'}\n"
             message += "----------------------\n"
         
         update.message.reply_text(message)
-        logger.info(f"Berhasil menampilkan {len(last_users)} voucher")
+        logger.info("Berhasil menampilkan %s voucher", len(last_users))
     except Exception as e:
-        logger.error(f"Error saat mengambil daftar user: {e}")
+        logger.error("Error saat mengambil daftar user: %s", e)
         update.message.reply_text(f'❌ Gagal mendapatkan daftar user: {str(e)}')
 
+def export_users(update: Update, context: CallbackContext) -> None:
+    """Handler untuk command /export, mengirim seluruh user hotspot sebagai file"""
+    config = load_config()
+    if not config:
+        update.message.reply_text('❌ Konfigurasi tidak ditemukan. Silakan atur melalui web interface.')
+        return
+    
+    fmt = context.args[0].lower() if context.args else 'csv'
+    if fmt not in voucher_io.FORMATS:
+        update.message.reply_text('Format: /export [csv|ndjson]')
+        return
+    
+    user = update.effective_user
+    logger.info("User %s mengekspor user hotspot format %s", user.id, fmt)
+    update.message.reply_text('🔄 Mengekspor user hotspot...')
+    
+    api = connect_to_mikrotik(config)
+    if not api:
+        update.message.reply_text(connection_failed_message())
+        return
+    
+    try:
+        # Tulis ke file sementara baris per baris agar memori tetap konstan
+        with tempfile.TemporaryFile() as f:
+            rows = voucher_io.iter_rows(api, 'ip/hotspot/user', voucher_io.EXPORT_FIELDS)
+            for chunk in voucher_io.export_chunks(rows, fmt):
+                f.write(chunk.encode('utf-8'))
+            api.close()
+            f.seek(0)
+            update.message.reply_document(document=f, filename=f'hotspot-users.{fmt}')
+    except Exception as e:
+        api.close()
+        logger.error("Error saat export user hotspot: %s", e)
+        update.message.reply_text(f'❌ Gagal mengekspor user: {str(e)}')
+
+def report(update: Update, context: CallbackContext) -> None:
+    """Handler untuk command /report, ringkasan penjualan voucher dari ledger lokal"""
+    period = context.args[0].lower() if context.args else 'hari'
+    if period not in voucher_ledger.PERIODS:
+        update.message.reply_text('Format: /report [hari|minggu|bulan]')
+        return
+    
+    user = update.effective_user
+    logger.info("User %s meminta laporan penjualan periode %s", user.id, period)
+    
+    try:
+        data = voucher_ledger.report(period)
+    except Exception as e:
+        logger.error("Error membuat laporan penjualan: %s", e)
+        update.message.reply_text(f'❌ Gagal membuat laporan: {str(e)}')
+        return
+    
+    if not data['count']:
+        update.message.reply_text(f'ℹ️ Belum ada voucher yang tercatat sejak {data["start"]}.')
+        return
+    
+    message = f"📈 Laporan Voucher ({period}, sejak {data['start']})\n\n"
+    message += f"🎫 Total: {data['count']} voucher\n"
+    message += f"💰 Pendapatan: {data['revenue']:,}\n\n"
+    message += "Per profile:\n"
+    for profile, count, revenue in data['by_profile']:
+        message += f"🔑 {profile}: {count} voucher ({revenue:,})\n"
+    message += "\nPer operator:\n"
+    for operator_id, operator_name, count, revenue in data['by_operator']:
+        message += f"👤 {operator_name or operator_id or 'Tidak diketahui'}: {count} voucher ({revenue:,})\n"
+    
+    update.message.reply_text(message)
+
+def flush_hotspot_events(context: CallbackContext) -> None:
+    """Job berkala untuk mengirim event hotspot yang terkumpul sebagai satu pesan"""
+    events = hotspot_watcher.drain()
+    if not events:
+        return
+    
+    config = load_config()
+    if not config or not config.get('TELEGRAM_CHAT_ID'):
+        return
+    
+    # Cek limit-uptime untuk semua user yang logout dalam satu query
+    limit_reached = set()
+    logouts = {session.user for kind, session in events if kind == 'logout'}
+    if logouts:
+        api = connect_to_mikrotik(config)
+        if api:
+            try:
+                limit_reached = find_limit_reached(api, logouts)
+            except Exception as e:
+                logger.error("Error memeriksa limit user hotspot: %s", e)
+            finally:
+                api.close()
+    
+    try:
+        context.bot.send_message(chat_id=config['TELEGRAM_CHAT_ID'], text=format_events(events, limit_reached))
+        logger.info("Mengirim notifikasi %s event hotspot", len(events))
+    except Exception as e:
+        logger.error("Gagal mengirim notifikasi hotspot: %s", e)
+
+def start_hotspot_watcher(updater, config):
+    """Menjalankan watcher event hotspot dan job pengiriman notifikasinya"""
+    global hotspot_watcher
+    
+    if not config.get('TELEGRAM_CHAT_ID') or not config.get('NOTIFY_HOTSPOT_EVENTS', True):
+        logger.info("Notifikasi event hotspot tidak aktif")
+        return
+    
+    hotspot_watcher = HotspotWatcher(lambda: connect_to_mikrotik(load_config()))
+    hotspot_watcher.start()
+    updater.job_queue.run_repeating(flush_hotspot_events, interval=NOTIFY_INTERVAL, first=NOTIFY_INTERVAL)
+    logger.info("Hotspot watcher dijalankan")
+
+def profile_command(update: Update, context: CallbackContext) -> None:
+    """Handler untuk command /profile [on|off], hanya untuk Chat ID admin di konfigurasi"""
+    config = load_config() or {}
+    if str(update.effective_chat.id) != str(config.get('TELEGRAM_CHAT_ID')):
+        update.message.reply_text('❌ Perintah ini hanya untuk admin.')
+        return
+    
+    args = [arg.lower() for arg in context.args]
+    if args and args[0] in ('on', 'off'):
+        profiling.settings['enabled'] = args[0] == 'on'
+        logger.info("Profiling %s oleh user %s", args[0], update.effective_user.id)
+    
+    state = 'aktif' if profiling.settings['enabled'] else 'tidak aktif'
+    update.message.reply_text(
+        f"⏱️ Profiling {state}\n"
+        f"Ambang batas: {profiling.settings['threshold_ms']} ms\n"
+        f"Trace command lambat disimpan di folder {profiling.TRACES_DIR}/\n\n"
+        f"Gunakan /profile on atau /profile off"
+    )
+
+def begin_update(update: Update, context: CallbackContext) -> None:
+    """Handler group -1: beri request ID untuk setiap update yang masuk"""
+    new_request_id()
+
+def end_update(update: Update, context: CallbackContext) -> None:
+    """Handler group terakhir: catat durasi penanganan update"""
+    logger.info("Update selesai diproses", extra={'duration_ms': request_duration_ms()})
+    clear_request_id()
+
+def notify_router_state(bot, state, since, error):
+    """Kirim notifikasi ke TELEGRAM_CHAT_ID saat status router berubah"""
+    config = load_config()
+    if not config or not config.get('TELEGRAM_CHAT_ID'):
+        return
+    
+    if state == OPEN:
+        text = f"🚨 {router_breaker.down_message()}"
+    else:
+        down_for = int(time.time() - since) if since else 0
+        text = f"✅ Router kembali online setelah {down_for // 60} menit {down_for % 60} detik"
+    bot.send_message(chat_id=config['TELEGRAM_CHAT_ID'], text=text)
+
+def start_health_sampler(config):
+    """Menjalankan sampler kesehatan router di background"""
+    global health_sampler
+    
+    interval = int(config.get('HEALTH_SAMPLE_INTERVAL', 30))
+    health_sampler = HealthSampler(
+        lambda: connect_to_mikrotik(load_config()),
+        interval=interval,
+        interfaces=config.get('TRAFFIC_INTERFACES'),
+    )
+    health_sampler.start()
+    logger.info("Health sampler dijalankan dengan interval %s detik", interval)
+
+def start_voucher_pool(config):
+    """Menjalankan pengisian ulang stok voucher jika VOUCHER_POOL diatur"""
+    global voucher_pool
+    
+    settings = config.get('VOUCHER_POOL')
+    if not settings:
+        logger.info("Stok voucher tidak aktif")
+        return
+    
+    voucher_pool = VoucherPool(lambda: connect_to_mikrotik(load_config()), settings)
+    voucher_pool.start()
+    logger.info("Stok voucher dijalankan untuk profile: %s", ', '.join(settings))
+
+def register_handlers(dispatcher):
+    """Daftarkan semua handler bot ke dispatcher (dipakai main() dan replay harness)"""
+    # Request ID dan durasi untuk setiap update
+    dispatcher.add_handler(TypeHandler(Update, begin_update), group=-1)
+    dispatcher.add_handler(TypeHandler(Update, end_update), group=1)
+    
+    # Menambahkan handlers
+    dispatcher.add_handler(CommandHandler("start", start))
+    dispatcher.add_handler(CommandHandler("list", list_vouchers))
+    dispatcher.add_handler(CommandHandler("status", status))
+    dispatcher.add_handler(CommandHandler("v", quick_voucher))
+    dispatcher.add_handler(CommandHandler("export", export_users))
+    dispatcher.add_handler(CommandHandler("report", report))
+    dispatcher.add_handler(CommandHandler("template", template_command))
+    dispatcher.add_handler(CommandHandler("profile", profile_command))
+    dispatcher.add_handler(CallbackQueryHandler(template_callback, pattern='^tpl_'))
+    
+    # Conversation handler untuk pembuatan voucher
+    voucher_conv_handler = ConversationHandler(
+        entry_points=[CommandHandler('voucher', voucher)],
+        states={
+            PROFILE: [CallbackQueryHandler(profile_callback, pattern='^profile_')],
+            USERNAME_TYPE: [
+                CallbackQueryHandler(username_type_callback, pattern='^username_'),
+                CallbackQueryHandler(pool_take_callback, pattern='^pool_take$')
+            ],
+            USERNAME: [MessageHandler(Filters.text & ~Filters.command, username_input)],
+            PASSWORD: [
+                CallbackQueryHandler(password_callback, pattern='^password_'),
+                MessageHandler(Filters.text & ~Filters.command, password_input)
+            ],
+            LIMIT: [MessageHandler(Filters.text & ~Filters.command, limit_input)],
+            COMMENT: [MessageHandler(Filters.text & ~Filters.command, comment_input)],
+        },
+        fallbacks=[CommandHandler('cancel', cancel)],
+    )
+    dispatcher.add_handler(voucher_conv_handler)
+    
+    # Conversation handler untuk detail voucher
+    detail_conv_handler = ConversationHandler(
+        entry_points=[CommandHandler('detail', detail_start)],
+        states={
+            DETAIL_USERNAME: [MessageHandler(Filters.text & ~Filters.command, detail_get_username)],
+        },
+        fallbacks=[CommandHandler('cancel', cancel)],
+    )
+    dispatcher.add_handler(detail_conv_handler)
+    
+    # Semua handler dibungkus; biayanya hanya satu pengecekan selama profiling tidak aktif
+    profiling.instrument_dispatcher(dispatcher)
+
 def main():
     """Fungsi utama untuk menjalankan bot"""
     # Periksa file konfigurasi
@@ -641,42 +1322,19 @@ def main():
         return
     
     try:
-        logger.info(f"Memulai bot dengan token: {token[:5]}...{token[-5:]}")
-        updater = Updater(token)
+        logger.info("Memulai bot dengan token: %s...%s", token[:5], token[-5:])
+        profiling.configure(config)
+        # Request khusus agar waktu kirim ke Telegram tercatat saat profiling aktif
+        bot = telegram.Bot(token, request=profiling.TracedRequest(con_pool_size=8))
+        updater = Updater(bot=bot)
         dispatcher = updater.dispatcher
         
-        # Menambahkan handlers
-        dispatcher.add_handler(CommandHandler("start", start))
-        dispatcher.add_handler(CommandHandler("list", list_vouchers))
-        dispatcher.add_handler(CommandHandler("status", status))
+        register_handlers(dispatcher)
         
-        # Conversation handler untuk pembuatan voucher
-        voucher_conv_handler = ConversationHandler(
-            entry_points=[CommandHandler('voucher', voucher)],
-            states={
-                PROFILE: [CallbackQueryHandler(profile_callback, pattern='^profile_')],
-                USERNAME_TYPE: [CallbackQueryHandler(username_type_callback, pattern='^username_')],
-                USERNAME: [MessageHandler(Filters.text & ~Filters.command, username_input)],
-                PASSWORD: [
-                    CallbackQueryHandler(password_callback, pattern='^password_'),
-                    MessageHandler(Filters.text & ~Filters.command, password_input)
-                ],
-                LIMIT: [MessageHandler(Filters.text & ~Filters.command, limit_input)],
-                COMMENT: [MessageHandler(Filters.text & ~Filters.command, comment_input)],
-            },
-            fallbacks=[CommandHandler('cancel', cancel)],
-        )
-        dispatcher.add_handler(voucher_conv_handler)
-        
-        # Conversation handler untuk detail voucher
-        detail_conv_handler = ConversationHandler(
-            entry_points=[CommandHandler('detail', detail_start)],
-            states={
-                DETAIL_USERNAME: [MessageHandler(Filters.text & ~Filters.command, detail_get_username)],
-            },
-            fallbacks=[CommandHandler('cancel', cancel)],
-        )
-        dispatcher.add_handler(detail_conv_handler)
+        router_breaker.on_state_change = lambda state, since, error: notify_router_state(updater.bot, state, since, error)
+        start_hotspot_watcher(updater, config)
+        start_health_sampler(config)
+        start_voucher_pool(config)
         
         # Memulai polling
         logger.info("Bot started polling")
@@ -690,7 +1348,7 @@ def main():
         logger.error("Token Telegram tidak sah atau sudah dicabut")
         print("ERROR: Token Telegram tidak sah atau sudah dicabut")
     except Exception as e:
-        logger.error(f"Error saat menjalankan bot: {e}")
+        logger.error("Error saat menjalankan bot: %s", e)
         print(f"ERROR: Terjadi kesalahan saat menjalankan bot: {e}")
 
 if __name__ == '__main__':
@@ -0,0 +1,51 @@
+import hashlib
+import threading
+import time
+
+CACHE_TTL = 30
+
+
+class VoucherCache:
+    """Snapshot tabel user hotspot di memori untuk API web.
+
+    ETag dihitung dari isi snapshot dan Last-Modified hanya berubah jika isinya
+    berubah, sehingga client yang polling mendapat 304 tanpa query ke router
+    selama snapshot masih segar. Operasi tulis memanggil invalidate().
+    """
+
+    def __init__(self, load_rows, ttl=CACHE_TTL):
+        self.load_rows = load_rows
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.users = {}
+        self.etag = None
+        self.last_modified = None
+        self.fetched_at = 0
+
+    def is_fresh(self):
+        return self.etag is not None and time.time() - self.fetched_at < self.ttl
+
+    def get(self):
+        """Kembalikan (users, etag, last_modified), memuat ulang dari router jika kadaluarsa"""
+        with self.lock:
+            if not self.is_fresh():
+                self.refresh()
+            return self.users, self.etag, self.last_modified
+
+    def refresh(self):
+        digest = hashlib.sha1()
+        users = {}
+        for user in self.load_rows():
+            users[user.name] = user
+            digest.update(repr(user.as_dict()).encode('utf-8'))
+
+        etag = digest.hexdigest()[:20]
+        if etag != self.etag:
+            self.last_modified = time.time()
+        self.users = users
+        self.etag = etag
+        self.fetched_at = time.time()
+
+    def invalidate(self):
+        with self.lock:
+            self.fetched_at = 0
@@ -0,0 +1,275 @@
+import csv
+import hashlib
+import io
+import json
+import logging
+import os
+import threading
+
+import librouteros
+from librouteros.protocol import compose_word
+
+logger = logging.getLogger(__name__)
+
+IMPORTS_DIR = 'imports'
+IMPORT_BATCH_SIZE = 100
+MAX_STORED_ERRORS = 20
+
+# Job import yang sedang berjalan di proses ini
+_running_jobs = set()
+_running_lock = threading.Lock()
+
+EXPORT_FIELDS = ('name', 'password', 'profile', 'limit-uptime', 'uptime', 'comment', 'disabled')
+IMPORT_FIELDS = ('name', 'password', 'profile', 'limit-uptime', 'comment', 'disabled')
+
+FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+
+
+def parse_reply(words):
+    """Parse kata balasan API menjadi dict, termasuk .tag yang tidak didukung parse_word"""
+    row = {}
+    for word in words:
+        if word.startswith('='):
+            _, key, value = word.split('=', 2)
+            row[key] = value
+        elif word.startswith('.tag='):
+            row['.tag'] = word[5:]
+    return row
+
+
+def iter_rows(api, path, fields, *query):
+    """Stream baris hasil print satu per satu.
+
+    Api.__call__ dari librouteros menampung seluruh balasan sampai !done, jadi
+    kalimat dibaca langsung dari protocol agar memori tetap konstan.
+    """
+    api.protocol.writeSentence(f'/{path}/print', f'=.proplist={",".join(fields)}', *query)
+    trap = None
+    while True:
+        reply_word, words = api.protocol.readSentence()
+        if reply_word == '!re':
+            yield parse_reply(words)
+        elif reply_word == '!trap':
+            trap = parse_reply(words)
+        elif reply_word == '!done':
+            break
+        elif reply_word == '!fatal':
+            raise librouteros.exceptions.FatalError(' '.join(words))
+    if trap:
+        raise librouteros.exceptions.TrapError(**trap)
+
+
+def iter_csv(rows, fields=EXPORT_FIELDS):
+    """Ubah baris menjadi potongan CSV, satu baris per potongan"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(fields)
+    yield buffer.getvalue()
+    for row in rows:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerow([row.get(field, '') for field in fields])
+        yield buffer.getvalue()
+
+
+def iter_ndjson(rows, fields=EXPORT_FIELDS):
+    """Ubah baris menjadi NDJSON, satu objek JSON per baris"""
+    for row in rows:
+        yield json.dumps({field: row[field] for field in fields if field in row}, ensure_ascii=False) + '\n'
+
+
+def export_chunks(rows, fmt):
+    if fmt == 'csv':
+        return iter_csv(rows)
+    return iter_ndjson(rows)
+
+
+def iter_import_rows(filename, fmt):
+    """Baca file import baris per baris (CSV dengan header, atau NDJSON)"""
+    with open(filename, 'r', encoding='utf-8', newline='') as f:
+        if fmt == 'csv':
+            for row in csv.DictReader(f):
+                yield row
+        else:
+            for line in f:
+                line = line.strip()
+                if line:
+                    yield json.loads(line)
+
+
+def add_batch(api, path, rows):
+    """Kirim beberapa perintah add sekaligus (tagged) lalu baca semua balasannya.
+
+    Mengembalikan daftar (index, pesan error) untuk baris yang gagal.
+    """
+    cmd = f'/{path}/add'
+    for index, row in enumerate(rows):
+        words = [compose_word(key, value) for key, value in row.items() if key in IMPORT_FIELDS and value not in (None, '')]
+        api.protocol.writeSentence(cmd, *words, f'.tag={index}')
+
+    errors = {}
+    pending = len(rows)
+    while pending:
+        reply_word, words = api.protocol.readSentence()
+        reply = parse_reply(words)
+        if reply_word == '!trap':
+            errors[int(reply['.tag'])] = reply.get('message', 'unknown error')
+        elif reply_word == '!done':
+            pending -= 1
+        elif reply_word == '!fatal':
+            raise librouteros.exceptions.FatalError(' '.join(words))
+    return sorted(errors.items())
+
+
+def find_existing(api, path, rows):
+    """Index baris yang sudah ada di router dengan nama dan password yang sama.
+
+    Dipakai setelah add_batch terputus di tengah jalan: router mungkin sudah
+    menjalankan perintah add walaupun balasannya tidak pernah diterima.
+    """
+    existing = {}
+    for start in range(0, len(rows), IMPORT_BATCH_SIZE):
+        batch = rows[start:start + IMPORT_BATCH_SIZE]
+        # ?name=a ?name=b ?#| : cocokkan salah satu nama dalam batch
+        query = [f"?name={row['name']}" for row in batch]
+        if len(batch) > 1:
+            query.append('?#' + '|' * (len(batch) - 1))
+        for found in iter_rows(api, path, ('name', 'password'), *query):
+            existing[str(found.get('name'))] = str(found.get('password', ''))
+    return {
+        index for index, row in enumerate(rows)
+        if existing.get(str(row['name'])) == str(row.get('password') or '')
+    }
+
+
+class ImportJob:
+    """Import user hotspot dari file dengan checkpoint agar dapat dilanjutkan.
+
+    ID job adalah hash isi file, sehingga upload ulang file yang sama
+    melanjutkan dari baris terakhir yang berhasil diproses.
+    """
+
+    def __init__(self, job_id, fmt, path='ip/hotspot/user'):
+        self.job_id = job_id
+        self.fmt = fmt
+        self.path = path
+        self.data_file = os.path.join(IMPORTS_DIR, f'{job_id}.{fmt}')
+        self.checkpoint_file = os.path.join(IMPORTS_DIR, f'{job_id}.json')
+        self.state = self.load_checkpoint()
+
+    @classmethod
+    def from_upload(cls, fileobj, fmt):
+        """Simpan file upload ke direktori imports dan buat (atau lanjutkan) job-nya"""
+        os.makedirs(IMPORTS_DIR, exist_ok=True)
+        digest = hashlib.sha1()
+        temp_file = os.path.join(IMPORTS_DIR, f'upload-{threading.get_ident()}.tmp')
+        with open(temp_file, 'wb') as out:
+            for chunk in iter(lambda: fileobj.read(64 * 1024), b''):
+                digest.update(chunk)
+                out.write(chunk)
+
+        job = cls(digest.hexdigest()[:16], fmt)
+        os.replace(temp_file, job.data_file)
+        return job
+
+    @classmethod
+    def load(cls, job_id):
+        checkpoint_file = os.path.join(IMPORTS_DIR, f'{job_id}.json')
+        if not os.path.exists(checkpoint_file):
+            return None
+        with open(checkpoint_file, 'r') as f:
+            state = json.load(f)
+        return cls(job_id, state['format'])
+
+    def load_checkpoint(self):
+        try:
+            with open(self.checkpoint_file, 'r') as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {
+                'job_id': self.job_id,
+                'format': self.fmt,
+                'status': 'pending',
+                'total': None,
+                'processed': 0,
+                'created': 0,
+                'failed': 0,
+                'errors': [],
+            }
+
+    def save_checkpoint(self):
+        temp_file = self.checkpoint_file + '.tmp'
+        with open(temp_file, 'w') as f:
+            json.dump(self.state, f)
+        os.replace(temp_file, self.checkpoint_file)
+
+    def run(self, connect):
+        """Jalankan import mulai dari checkpoint terakhir, per batch IMPORT_BATCH_SIZE baris"""
+        if self.state['status'] == 'completed':
+            return self.state
+
+        if self.state['total'] is None:
+            self.state['total'] = sum(1 for _ in iter_import_rows(self.data_file, self.fmt))
+
+        self.state['status'] = 'running'
+        self.save_checkpoint()
+
+        api = None
+        try:
+            api = connect()
+            rows = iter_import_rows(self.data_file, self.fmt)
+            # Lewati baris yang sudah diproses sebelumnya
+            for _ in range(self.state['processed']):
+                next(rows, None)
+
+            batch = []
+            for row in rows:
+                batch.append(row)
+                if len(batch) >= IMPORT_BATCH_SIZE:
+                    self.commit_batch(api, batch)
+                    batch = []
+            if batch:
+                self.commit_batch(api, batch)
+
+            self.state['status'] = 'completed'
+            logger.info("Import %s selesai: %s dibuat, %s gagal", self.job_id, self.state['created'], self.state['failed'])
+        except Exception as e:
+            self.state['status'] = 'failed'
+            self.state['last_error'] = str(e)
+            logger.error("Import %s berhenti pada baris %s: %s", self.job_id, self.state['processed'], e)
+        finally:
+            self.save_checkpoint()
+            if api:
+                api.close()
+        return self.state
+
+    def commit_batch(self, api, batch):
+        errors = add_batch(api, self.path, batch)
+        start = self.state['processed']
+        for index, message in errors:
+            self.state['errors'].append({'row': start + index + 1, 'name': batch[index].get('name'), 'message': message})
+        self.state['errors'] = self.state['errors'][-MAX_STORED_ERRORS:]
+        self.state['failed'] += len(errors)
+        self.state['created'] += len(batch) - len(errors)
+        self.state['processed'] += len(batch)
+        self.save_checkpoint()
+
+    def start(self, connect):
+        """Jalankan import di background, kecuali job yang sama sedang berjalan"""
+        with _running_lock:
+            if self.job_id in _running_jobs:
+                return False
+            _running_jobs.add(self.job_id)
+
+        def target():
+            try:
+                self.run(connect)
+            finally:
+                with _running_lock:
+                    _running_jobs.discard(self.job_id)
+
+        threading.Thread(target=target, name=f'import-{self.job_id}', daemon=True).start()
+        return True
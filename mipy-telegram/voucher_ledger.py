@@ -0,0 +1,130 @@
+import datetime
+import sqlite3
+import time
+
+LEDGER_FILE = 'voucher_ledger.db'
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS vouchers (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    created_at INTEGER NOT NULL,
+    day TEXT NOT NULL,
+    username TEXT NOT NULL,
+    profile TEXT NOT NULL,
+    limit_uptime TEXT,
+    comment TEXT,
+    price INTEGER NOT NULL DEFAULT 0,
+    operator_id INTEGER,
+    operator_name TEXT,
+    source TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_vouchers_day_profile ON vouchers (day, profile);
+CREATE INDEX IF NOT EXISTS idx_vouchers_operator_day ON vouchers (operator_id, day);
+CREATE INDEX IF NOT EXISTS idx_vouchers_username ON vouchers (username);
+
+CREATE TRIGGER IF NOT EXISTS vouchers_no_update BEFORE UPDATE ON vouchers
+BEGIN
+    SELECT RAISE(ABORT, 'ledger voucher bersifat append-only');
+END;
+CREATE TRIGGER IF NOT EXISTS vouchers_no_delete BEFORE DELETE ON vouchers
+BEGIN
+    SELECT RAISE(ABORT, 'ledger voucher bersifat append-only');
+END;
+
+CREATE TABLE IF NOT EXISTS daily_totals (
+    day TEXT NOT NULL,
+    profile TEXT NOT NULL,
+    operator_id INTEGER NOT NULL,
+    operator_name TEXT,
+    count INTEGER NOT NULL,
+    revenue INTEGER NOT NULL,
+    PRIMARY KEY (day, profile, operator_id)
+);
+CREATE INDEX IF NOT EXISTS idx_daily_totals_operator ON daily_totals (operator_id, day);
+'''
+
+# Jumlah hari ke belakang untuk setiap periode laporan
+PERIODS = {
+    'hari': 0,
+    'minggu': 6,
+    'bulan': 29,
+}
+
+_initialized = set()
+
+
+def connect(path=LEDGER_FILE):
+    conn = sqlite3.connect(path, timeout=10)
+    if path not in _initialized:
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.executescript(SCHEMA)
+        _initialized.add(path)
+    return conn
+
+
+def record(vouchers, operator_id=None, operator_name=None, source=None, prices=None, path=LEDGER_FILE):
+    """Catat voucher yang dibuat beserta agregat hariannya dalam satu transaksi"""
+    if not vouchers:
+        return
+
+    prices = prices or {}
+    now = int(time.time())
+    day = datetime.date.fromtimestamp(now).isoformat()
+    rows = [
+        (now, day, v['username'], v['profile'], v.get('limit'), v.get('comment'),
+         int(prices.get(v['profile'], 0)), operator_id, operator_name, source)
+        for v in vouchers
+    ]
+
+    totals = {}
+    for row in rows:
+        count, revenue = totals.get(row[3], (0, 0))
+        totals[row[3]] = (count + 1, revenue + row[6])
+
+    conn = connect(path)
+    try:
+        with conn:
+            conn.executemany(
+                'INSERT INTO vouchers (created_at, day, username, profile, limit_uptime, comment, '
+                'price, operator_id, operator_name, source) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                rows
+            )
+            conn.executemany(
+                'INSERT INTO daily_totals (day, profile, operator_id, operator_name, count, revenue) '
+                'VALUES (?, ?, ?, ?, ?, ?) '
+                'ON CONFLICT (day, profile, operator_id) DO UPDATE SET '
+                'count = count + excluded.count, revenue = revenue + excluded.revenue, '
+                'operator_name = excluded.operator_name',
+                [(day, profile, operator_id or 0, operator_name, count, revenue)
+                 for profile, (count, revenue) in totals.items()]
+            )
+    finally:
+        conn.close()
+
+
+def report(period, path=LEDGER_FILE):
+    """Total voucher dan pendapatan per profile dan per operator untuk periode tertentu"""
+    start = (datetime.date.today() - datetime.timedelta(days=PERIODS[period])).isoformat()
+
+    conn = connect(path)
+    try:
+        by_profile = conn.execute(
+            'SELECT profile, SUM(count), SUM(revenue) FROM daily_totals '
+            'WHERE day >= ? GROUP BY profile ORDER BY SUM(count) DESC',
+            (start,)
+        ).fetchall()
+        by_operator = conn.execute(
+            'SELECT operator_id, MAX(operator_name), SUM(count), SUM(revenue) FROM daily_totals '
+            'WHERE day >= ? GROUP BY operator_id ORDER BY SUM(count) DESC',
+            (start,)
+        ).fetchall()
+    finally:
+        conn.close()
+
+    return {
+        'start': start,
+        'by_profile': by_profile,
+        'by_operator': by_operator,
+        'count': sum(row[1] for row in by_profile),
+        'revenue': sum(row[2] for row in by_profile),
+    }
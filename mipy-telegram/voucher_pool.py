@@ -0,0 +1,215 @@
+import logging
+import random
+import sqlite3
+import string
+import threading
+import time
+
+from librouteros.query import Key
+
+import voucher_io
+
+logger = logging.getLogger(__name__)
+
+POOL_FILE = 'voucher_pool.db'
+POOL_COMMENT_PREFIX = 'pool:'
+REFILL_INTERVAL = 60
+POOL_FIELDS = ('name', 'password', 'profile', 'limit-uptime')
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS stock (
+    username TEXT PRIMARY KEY,
+    password TEXT NOT NULL,
+    profile TEXT NOT NULL,
+    limit_uptime TEXT,
+    created_at INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_stock_profile ON stock (profile, limit_uptime, created_at);
+
+CREATE TABLE IF NOT EXISTS pending_comments (
+    username TEXT PRIMARY KEY,
+    comment TEXT
+);
+'''
+
+
+def pool_comment(profile):
+    """Komentar penanda voucher stok di router"""
+    return f'{POOL_COMMENT_PREFIX}{profile}'
+
+
+def random_string(length):
+    chars = string.ascii_letters + string.digits
+    return ''.join(random.choice(chars) for _ in range(length))
+
+
+class VoucherPool:
+    """Stok voucher yang sudah dibuat di router untuk dibagikan tanpa menunggu router.
+
+    Voucher stok ditandai dengan komentar "pool:<profile>" di router dan dicatat
+    di SQLite lokal. take() hanya operasi lokal; komentar voucher yang dibagikan
+    diperbarui oleh thread refill, bersama pengisian ulang stok yang berada di
+    bawah watermark.
+
+    settings: {profile: {'stock': 20, 'watermark': 5, 'limit': '1h'}}
+    """
+
+    def __init__(self, connect, settings, path=POOL_FILE, interval=REFILL_INTERVAL):
+        self.connect = connect
+        self.settings = settings
+        self.path = path
+        self.interval = interval
+        self.wakeup = threading.Event()
+        self.running = False
+        conn = self.db()
+        conn.executescript(SCHEMA)
+        conn.close()
+
+    def db(self):
+        return sqlite3.connect(self.path, timeout=10)
+
+    def start(self):
+        self.running = True
+        threading.Thread(target=self.run, name='voucher-pool', daemon=True).start()
+
+    def stop(self):
+        self.running = False
+        self.wakeup.set()
+
+    def available(self, profile, limit=None):
+        """Jumlah voucher stok untuk profile (dan limit) tertentu"""
+        conn = self.db()
+        try:
+            return conn.execute(
+                'SELECT COUNT(*) FROM stock WHERE profile = ? AND limit_uptime IS ?', (profile, limit)
+            ).fetchone()[0]
+        finally:
+            conn.close()
+
+    def take(self, profile, limit=None, count=1, comment=None):
+        """Ambil voucher dari stok lokal; komentar di router diperbarui secara asinkron"""
+        conn = self.db()
+        try:
+            with conn:
+                conn.execute('BEGIN IMMEDIATE')
+                rows = conn.execute(
+                    'SELECT username, password, profile, limit_uptime FROM stock '
+                    'WHERE profile = ? AND limit_uptime IS ? ORDER BY created_at LIMIT ?',
+                    (profile, limit, count)
+                ).fetchall()
+                conn.executemany('DELETE FROM stock WHERE username = ?', [(row[0],) for row in rows])
+                conn.executemany(
+                    'INSERT OR REPLACE INTO pending_comments (username, comment) VALUES (?, ?)',
+                    [(row[0], comment or '') for row in rows]
+                )
+        finally:
+            conn.close()
+
+        if rows:
+            self.wakeup.set()
+        return [
+            {'username': row[0], 'password': row[1], 'profile': row[2], 'limit': row[3], 'comment': comment}
+            for row in rows
+        ]
+
+    def run(self):
+        reconciled = False
+        while self.running:
+            api = None
+            try:
+                # connect() di dalam try: satu exception tidak boleh menghentikan refill
+                api = self.connect()
+                if api:
+                    if not reconciled:
+                        self.reconcile(api)
+                        reconciled = True
+                    self.flush_comments(api)
+                    self.refill(api)
+            except Exception as e:
+                logger.error("Error memproses stok voucher: %s", e)
+            finally:
+                if api:
+                    api.close()
+            self.wakeup.wait(self.interval)
+            self.wakeup.clear()
+
+    def reconcile(self, api):
+        """Samakan stok lokal dengan voucher berkomentar pool: yang ada di router"""
+        conn = self.db()
+        try:
+            pending = {row[0] for row in conn.execute('SELECT username FROM pending_comments')}
+        finally:
+            conn.close()
+
+        router_rows = {}
+        for profile in self.settings:
+            # Baca baris satu per satu dengan filter komentar di router
+            rows = voucher_io.iter_rows(
+                api, 'ip/hotspot/user', POOL_FIELDS, f'?comment={pool_comment(profile)}'
+            )
+            for row in rows:
+                if row['name'] not in pending:
+                    router_rows[row['name']] = row
+
+        conn = self.db()
+        try:
+            with conn:
+                local = {row[0] for row in conn.execute('SELECT username FROM stock')}
+                conn.executemany(
+                    'DELETE FROM stock WHERE username = ?',
+                    [(name,) for name in local - router_rows.keys()]
+                )
+                conn.executemany(
+                    'INSERT INTO stock (username, password, profile, limit_uptime, created_at) VALUES (?, ?, ?, ?, ?)',
+                    [(name, str(row.get('password', '')), row['profile'], row.get('limit-uptime'), int(time.time()))
+                     for name, row in router_rows.items() if name not in local]
+                )
+        finally:
+            conn.close()
+        logger.info("Stok voucher disinkronkan: %s voucher di router", len(router_rows))
+
+    def flush_comments(self, api):
+        """Perbarui komentar voucher yang sudah dibagikan"""
+        conn = self.db()
+        try:
+            pending = conn.execute('SELECT username, comment FROM pending_comments').fetchall()
+            users = api.path('ip/hotspot/user')
+            for username, comment in pending:
+                row = next(iter(users.select('.id').where(Key('name') == username)), None)
+                if row:
+                    users.update(**{'.id': row['.id'], 'comment': comment})
+                with conn:
+                    conn.execute('DELETE FROM pending_comments WHERE username = ?', (username,))
+        finally:
+            conn.close()
+
+    def refill(self, api):
+        """Isi ulang stok profile yang jumlahnya di bawah watermark"""
+        for profile, setting in self.settings.items():
+            limit = setting.get('limit')
+            current = self.available(profile, limit)
+            if current >= int(setting.get('watermark', 0)):
+                continue
+
+            needed = int(setting.get('stock', 0)) - current
+            rows = [{
+                'name': random_string(8),
+                'password': random_string(8),
+                'profile': profile,
+                'limit-uptime': limit,
+                'comment': pool_comment(profile),
+            } for _ in range(needed)]
+
+            failed = {index for index, _ in voucher_io.add_batch(api, 'ip/hotspot/user', rows)}
+            created = [row for index, row in enumerate(rows) if index not in failed]
+
+            conn = self.db()
+            try:
+                with conn:
+                    conn.executemany(
+                        'INSERT INTO stock (username, password, profile, limit_uptime, created_at) VALUES (?, ?, ?, ?, ?)',
+                        [(row['name'], row['password'], profile, limit, int(time.time())) for row in created]
+                    )
+            finally:
+                conn.close()
+            logger.info("Stok voucher %s diisi ulang: %s dibuat, %s gagal", profile, len(created), len(failed))
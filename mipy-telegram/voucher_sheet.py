@@ -0,0 +1,168 @@
+import io
+import os
+from itertools import islice
+from urllib.parse import urlencode
+
+from jinja2 import Environment, FileSystemLoader, select_autoescape
+from markupsafe import Markup
+
+# qrcode dibutuhkan untuk QR code (SVG di HTML dan PNG), Pillow hanya untuk render PNG
+try:
+    import qrcode
+except ImportError:
+    qrcode = None
+
+try:
+    from PIL import Image, ImageDraw, ImageFont
+except ImportError:
+    Image = None
+
+TEMPLATES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'templates')
+
+COLUMNS = 3
+ROWS = 8
+CARDS_PER_PAGE = COLUMNS * ROWS
+
+# Ukuran kartu PNG dalam pixel
+CARD_WIDTH = 400
+CARD_HEIGHT = 160
+CARD_MARGIN = 10
+QR_SIZE = 140
+
+_env = Environment(
+    loader=FileSystemLoader(TEMPLATES_DIR),
+    autoescape=select_autoescape(['html']),
+)
+
+
+def voucher_card(row):
+    """Normalisasi data voucher dari bot ({username, password, limit}) atau baris /ip/hotspot/user"""
+    return {
+        'username': row.get('username', row.get('name', '')),
+        'password': row.get('password', ''),
+        'profile': row.get('profile', ''),
+        'limit': row.get('limit', row.get('limit-uptime')),
+    }
+
+
+def login_link(login_url, voucher):
+    """URL login hotspot yang dimasukkan ke QR code"""
+    return f"{login_url}?{urlencode({'username': voucher['username'], 'password': voucher['password']})}"
+
+
+def qr_svg(data):
+    """QR code sebagai SVG inline, dibuat di server tanpa JavaScript, atau None tanpa paket qrcode"""
+    if qrcode is None:
+        return None
+
+    # Mask tetap: pencarian mask terbaik mendominasi waktu render ribuan kartu
+    qr = qrcode.QRCode(border=1, error_correction=qrcode.constants.ERROR_CORRECT_L, mask_pattern=0)
+    qr.add_data(data)
+    matrix = qr.get_matrix()
+    size = len(matrix)
+    # Satu path untuk semua modul gelap; modul berurutan dalam satu baris digabung
+    parts = []
+    for y, row in enumerate(matrix):
+        x = 0
+        while x < size:
+            if not row[x]:
+                x += 1
+                continue
+            start = x
+            while x < size and row[x]:
+                x += 1
+            parts.append(f'M{start},{y}h{x - start}v1h-{x - start}z')
+    path = ''.join(parts)
+    return Markup(
+        f'<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 {size} {size}" '
+        f'shape-rendering="crispEdges"><path d="{path}"/></svg>'
+    )
+
+
+def sheet_card(row, login_url=None):
+    """Kartu untuk lembar HTML, dengan QR code login jika URL login diatur"""
+    card = voucher_card(row)
+    if login_url:
+        card['qr'] = qr_svg(login_link(login_url, card))
+    return card
+
+
+def render_html(vouchers, login_url=None, title='Voucher Hotspot'):
+    """Render lembar cetak HTML sebagai generator potongan string.
+
+    `vouchers` boleh berupa generator; data dibaca per halaman sehingga
+    lembar dengan ribuan kartu tidak pernah dibangun sebagai satu string.
+    QR code dibuat per kartu saat kartu tersebut dirender.
+    """
+    template = _env.get_template('voucher_sheet.html')
+    return template.generate(
+        vouchers=(sheet_card(row, login_url) for row in vouchers),
+        login_url=login_url,
+        title=title,
+        columns=COLUMNS,
+        per_page=CARDS_PER_PAGE,
+    )
+
+
+def render_html_file(vouchers, login_url=None, title='Voucher Hotspot'):
+    """Render lembar cetak HTML ke file in-memory untuk dikirim sebagai dokumen"""
+    buffer = io.BytesIO()
+    for chunk in render_html(vouchers, login_url, title):
+        buffer.write(chunk.encode('utf-8'))
+    buffer.seek(0)
+    return buffer
+
+
+def iter_pages(vouchers, per_page=CARDS_PER_PAGE):
+    """Bagi voucher menjadi halaman tanpa memuat semuanya ke memori"""
+    iterator = (voucher_card(row) for row in vouchers)
+    while True:
+        page = list(islice(iterator, per_page))
+        if not page:
+            return
+        yield page
+
+
+def png_available():
+    return qrcode is not None and Image is not None
+
+
+def render_png_page(page, login_url=None):
+    """Render satu halaman kartu voucher menjadi PNG, mengembalikan file in-memory"""
+    if not png_available():
+        raise RuntimeError("Render PNG membutuhkan paket qrcode dan Pillow")
+
+    rows = (len(page) + COLUMNS - 1) // COLUMNS
+    width = COLUMNS * (CARD_WIDTH + CARD_MARGIN) + CARD_MARGIN
+    height = rows * (CARD_HEIGHT + CARD_MARGIN) + CARD_MARGIN
+    image = Image.new('RGB', (width, height), 'white')
+    draw = ImageDraw.Draw(image)
+    font = ImageFont.load_default()
+
+    for index, voucher in enumerate(page):
+        left = CARD_MARGIN + (index % COLUMNS) * (CARD_WIDTH + CARD_MARGIN)
+        top = CARD_MARGIN + (index // COLUMNS) * (CARD_HEIGHT + CARD_MARGIN)
+        draw.rectangle([left, top, left + CARD_WIDTH, top + CARD_HEIGHT], outline='black')
+
+        text_left = left + 10
+        if login_url:
+            qr = qrcode.QRCode(border=1, error_correction=qrcode.constants.ERROR_CORRECT_L)
+            qr.add_data(login_link(login_url, voucher))
+            qr_image = qr.make_image().convert('RGB').resize((QR_SIZE, QR_SIZE))
+            image.paste(qr_image, (left + 10, top + 10))
+            text_left = left + QR_SIZE + 20
+
+        lines = [
+            voucher['profile'],
+            f"User: {voucher['username']}",
+            f"Pass: {voucher['password']}",
+        ]
+        if voucher['limit']:
+            lines.append(f"Limit: {voucher['limit']}")
+        for line_index, line in enumerate(lines):
+            draw.text((text_left, top + 20 + line_index * 25), line, fill='black', font=font)
+
+    buffer = io.BytesIO()
+    image.save(buffer, format='PNG')
+    buffer.seek(0)
+    return buffer